@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import FLAG_CLAIMS, USER_VERSION_CLAIM
+
+# Cache alias configured in settings.CACHES, shared by the workers on a host
+AUTH_CACHE = "auth"
+# Other hosts keep a user's old version at most this long (seconds), which
+# is why only tokens without staff or superuser rights are trusted from it
+VERSION_TIMEOUT = 5 * 60
+# Cached for users that are inactive or gone, no token carries it
+REVOKED = -1
+
+
+def version_key(user_id):
+    return f"accounts:auth_version:{user_id}"
+
+
+def current_version(user_id):
+    # The user's auth_version, REVOKED when the user cannot log in
+    cache = caches[AUTH_CACHE]
+    version = cache.get(version_key(user_id))
+    if version is None:
+        row = (
+            get_user_model()
+            .objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list("auth_version", "is_active")
+            .first()
+        )
+        version = row[0] if row and row[1] else REVOKED
+        cache.set(version_key(user_id), version, VERSION_TIMEOUT)
+    return version
+
+
+async def acurrent_version(user_id):
+    cache = caches[AUTH_CACHE]
+    version = await cache.aget(version_key(user_id))
+    if version is None:
+        row = await (
+            get_user_model()
+            .objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list("auth_version", "is_active")
+            .afirst()
+        )
+        version = row[0] if row and row[1] else REVOKED
+        await cache.aset(version_key(user_id), version, VERSION_TIMEOUT)
+    return version
+
+
+def forget_version(user_id):
+    caches[AUTH_CACHE].delete(version_key(user_id))
+
+
+def claims_user(token):
+    """
+    Build the user from the token claims. It is a real model instance, so it
+    works in queries and as a foreign key, with every other field deferred:
+    reading one of them (e.g. user.email) loads it from the database.
+    """
+    User = get_user_model()
+    claims = {claim: token[claim] for claim in FLAG_CLAIMS}
+    claims[User._meta.get_field(api_settings.USER_ID_FIELD).attname] = token[
+        api_settings.USER_ID_CLAIM
+    ]
+    claims["is_active"] = True
+    fields = [
+        field.attname for field in User._meta.concrete_fields if field.attname in claims
+    ]
+    return User.from_db(DEFAULT_DB_ALIAS, fields, [claims[name] for name in fields])
+
+
+def has_user_claims(token):
+    return all(
+        claim in token
+        for claim in (api_settings.USER_ID_CLAIM, USER_VERSION_CLAIM, *FLAG_CLAIMS)
+    )
+
+
+def trusts_claims(token):
+    # Staff and superuser rights are always read from the database, so taking
+    # them away is not delayed by the version cache of other hosts
+    return has_user_claims(token) and not any(token[claim] for claim in FLAG_CLAIMS)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the claims of tokens issued by
+    accounts.tokens.UserRefreshToken while their user_version is current,
+    which costs a cache lookup instead of a query. Older tokens, tokens of
+    users whose password or permission flags changed since, and tokens
+    claiming staff or superuser rights fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if trusts_claims(validated_token):
+            version = current_version(validated_token[api_settings.USER_ID_CLAIM])
+            if validated_token[USER_VERSION_CLAIM] == version:
+                return claims_user(validated_token)
+        elif api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return super().get_user(validated_token)
@@ -0,0 +1,70 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BlacklistedToken
+
+# Cache alias configured in settings.CACHES, shared by the workers on one host
+BLACKLIST_CACHE = "blacklist"
+
+
+class DatabaseBlacklist:
+    """
+    Blacklisted refresh tokens, one indexed row per jti that is kept until
+    the token expires. `manage.py prune_token_blacklist` deletes the rest,
+    so the table only ever holds the tokens that could still be replayed.
+    """
+
+    def contains(self, jti):
+        return BlacklistedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jti, expires_at):
+        # A token refreshed twice at once is already blacklisted
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(jti=jti, expires_at=expires_at)], ignore_conflicts=True
+        )
+
+    def prune(self, batch_size=1000):
+        # Delete the expired rows a batch at a time to keep the locks short
+        now = timezone.now()
+        expired = BlacklistedToken.objects.filter(expires_at__lte=now)
+        deleted = 0
+        while True:
+            ids = list(expired.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += BlacklistedToken.objects.filter(id__in=ids).delete()[0]
+
+
+class CachedBlacklist(DatabaseBlacklist):
+    """
+    DatabaseBlacklist with every jti also written to the blacklist cache
+    until its token expires. That cache lives on one host, so it only saves
+    the query when a replay reaches the host that rotated the token; every
+    miss, whether the entry was culled or added on another host, is checked
+    in the database. The lookup stays cheap because of the unique jti index
+    and prune_token_blacklist, which keeps the table to unexpired tokens.
+    """
+
+    def key(self, jti):
+        return f"accounts:blacklist:{jti}"
+
+    def contains(self, jti):
+        if caches[BLACKLIST_CACHE].get(self.key(jti)):
+            return True
+        return super().contains(jti)
+
+    def add(self, jti, expires_at):
+        super().add(jti, expires_at)
+        timeout = (expires_at - timezone.now()).total_seconds()
+        if timeout > 0:
+            caches[BLACKLIST_CACHE].set(self.key(jti), True, timeout)
+
+
+@lru_cache(maxsize=None)
+def get_blacklist():
+    # The backend named by settings.TOKEN_BLACKLIST_BACKEND
+    return import_string(settings.TOKEN_BLACKLIST_BACKEND)()
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+# Cost parameters of the login hashers, set in settings.PASSWORD_COST. A
+# changed value makes must_update() true for the stored hashes, so each
+# one is rehashed at its user's next login.
+DEFAULT_COST = {
+    # n = 2**14, r = 8: 16 MiB, about 50 ms per login
+    "scrypt_work_factor": 2**14,
+    "scrypt_block_size": 8,
+    "scrypt_parallelism": 1,
+    # OWASP minimum for Argon2id: 19 MiB, two passes
+    "argon2_time_cost": 2,
+    "argon2_memory_cost": 19 * 1024,
+    "argon2_parallelism": 1,
+}
+
+
+def cost(name):
+    return getattr(settings, "PASSWORD_COST", {}).get(name, DEFAULT_COST[name])
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    # Same "scrypt" algorithm, so Django's own scrypt hashes verify too
+    work_factor = cost("scrypt_work_factor")
+    block_size = cost("scrypt_block_size")
+    parallelism = cost("scrypt_parallelism")
+    # OpenSSL refuses scrypt above 32 MiB unless maxmem is raised
+    maxmem = 2 * 128 * work_factor * block_size * parallelism
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    # Needs argon2-cffi, like Django's Argon2PasswordHasher
+    time_cost = cost("argon2_time_cost")
+    memory_cost = cost("argon2_memory_cost")
+    parallelism = cost("argon2_parallelism")
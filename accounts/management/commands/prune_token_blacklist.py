@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.blacklist import get_blacklist
+
+
+class Command(BaseCommand):
+    help = "Delete blacklisted refresh tokens that have expired, run it daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows deleted per query (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = get_blacklist().prune(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} blacklisted tokens."))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="auth_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
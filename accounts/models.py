@@ -38,6 +38,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Bumped by accounts.signals when the password is set (not rehashed),
+    # or is_active, is_staff or is_superuser change; access tokens issued
+    # before then are re-checked
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
 
     groups = models.ManyToManyField(
         "auth.Group",
@@ -57,3 +61,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class BlacklistedToken(models.Model):
+    # Refresh tokens that were rotated, see accounts.blacklist
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -1,10 +1,18 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+
+from backend.serializers import TimedSerializerMixin
+
+from .tokens import UserRefreshToken
 
 CustomUser = get_user_model()
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -31,7 +39,7 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField(required=True)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     is_superuser = serializers.BooleanField(read_only=True)
     is_staff = serializers.BooleanField(read_only=True)
     profile_image = serializers.ImageField(required=False)
@@ -66,7 +74,17 @@ class DeleteAccountSerializer(serializers.Serializer):
     password = serializers.CharField(required=True)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ["id", "email", "name", "surname"]
+
+
+# /api/auth/token/obtain/ issues tokens with the claims of UserRefreshToken
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserRefreshToken
+
+
+# /api/auth/token/refresh/ blacklists the rotated token, see accounts.blacklist
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserRefreshToken
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import forget_version
+from .models import CustomUser
+
+# Changes that must reach the claims of outstanding access tokens
+TRACKED_FIELDS = ("password", "is_active", "is_staff", "is_superuser")
+
+
+def password_set(instance):
+    # set_password() keeps the raw password until the save, check_password()
+    # drops it before saving a rehash of the same password (a hasher or cost
+    # upgrade at login), which must not log the user out everywhere
+    return instance._password is not None or not instance.has_usable_password()
+
+
+# Compare with the stored row, only loaded fields can have been changed
+@receiver(pre_save, sender=CustomUser)
+def user_pre_save(sender, instance, update_fields=None, **kwargs):
+    instance._auth_changed = False
+    if instance.pk is None:
+        return
+    fields = set(TRACKED_FIELDS) - instance.get_deferred_fields()
+    if not password_set(instance):
+        fields.discard("password")
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    previous = (
+        CustomUser.objects.filter(pk=instance.pk)
+        .values("auth_version", *fields)
+        .first()
+    )
+    if previous is not None and any(
+        previous[field] != getattr(instance, field) for field in fields
+    ):
+        # Tokens issued from this instance afterwards carry the new version
+        instance.auth_version = previous["auth_version"] + 1
+        instance._auth_changed = True
+
+
+# update_fields may not include auth_version, so write it with a query
+@receiver(post_save, sender=CustomUser)
+def user_post_save(sender, instance, created, **kwargs):
+    if getattr(instance, "_auth_changed", False):
+        CustomUser.objects.filter(pk=instance.pk).update(
+            auth_version=instance.auth_version
+        )
+        user_id = instance.pk
+        transaction.on_commit(lambda: forget_version(user_id))
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_post_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_version(user_id))
@@ -1,3 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.testing import clear_caches, isolated_caches
+
+from .authentication import CachedJWTAuthentication, current_version
+from .blacklist import BLACKLIST_CACHE, CachedBlacklist
+from .models import BlacklistedToken
+from .tokens import UserRefreshToken
+
+User = get_user_model()
+
+
+@isolated_caches
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def make_user(self, **extra_fields):
+        return User.objects.create_user(
+            email="user@example.com", password="test-password", **extra_fields
+        )
+
+    def authenticate(self, user):
+        authentication = CachedJWTAuthentication()
+        token = authentication.get_validated_token(
+            str(UserRefreshToken.for_user(user).access_token)
+        )
+        return authentication.get_user(token)
+
+    def test_user_claims_are_trusted_while_the_version_is_current(self):
+        user = self.make_user()
+        current_version(user.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(user).pk, user.pk)
+
+    def test_staff_claims_are_checked_against_the_database(self):
+        user = self.make_user(is_staff=True)
+        current_version(user.pk)
+        # Demoted on another host: this host's cached version is stale
+        User.objects.filter(pk=user.pk).update(is_staff=False)
+
+        self.assertFalse(self.authenticate(user).is_staff)
+
+
+@isolated_caches
+class AuthVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="test-password"
+        )
+
+    def stored_version(self):
+        return User.objects.values_list("auth_version", flat=True).get()
+
+    def test_rehash_at_login_keeps_the_version(self):
+        User.objects.update(
+            password=make_password("test-password", hasher="pbkdf2_sha1")
+        )
+        user = User.objects.get()
+
+        self.assertTrue(user.check_password("test-password"))
+        self.assertFalse(user.password.startswith("pbkdf2_sha1$"))
+        self.assertEqual(self.stored_version(), 0)
+
+    def test_setting_a_password_bumps_the_version(self):
+        self.user.set_password("new-password")
+        self.user.save()
+
+        self.assertEqual(self.stored_version(), 1)
+
+
+@isolated_caches
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.blacklist = CachedBlacklist()
+
+    def refresh(self, token):
+        return APIClient().post(
+            reverse("token_refresh"), {"refresh": str(token)}, secure=True
+        )
+
+    def test_a_rotated_refresh_token_cannot_be_replayed(self):
+        user = User.objects.create_user(
+            email="user@example.com", password="test-password"
+        )
+        token = UserRefreshToken.for_user(user)
+
+        self.assertEqual(self.refresh(token).status_code, 200)
+        response = self.refresh(token)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["detail"], "Token is blacklisted")
+
+    def test_a_cache_miss_is_checked_in_the_database(self):
+        self.blacklist.add("rotated", timezone.now() + timedelta(days=1))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.blacklist.contains("rotated"))
+
+        # Culled here, or rotated on another host
+        caches[BLACKLIST_CACHE].clear()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.blacklist.contains("rotated"))
+        self.assertFalse(self.blacklist.contains("unknown"))
+
+    def test_pruning_deletes_only_expired_tokens(self):
+        now = timezone.now()
+        BlacklistedToken.objects.bulk_create(
+            [
+                BlacklistedToken(jti="expired", expires_at=now - timedelta(hours=1)),
+                BlacklistedToken(jti="live", expires_at=now + timedelta(hours=1)),
+            ]
+        )
+
+        call_command("prune_token_blacklist", stdout=StringIO())
 
-# Create your tests here.
+        self.assertEqual(
+            list(BlacklistedToken.objects.values_list("jti", flat=True)), ["live"]
+        )
@@ -0,0 +1,41 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import get_blacklist
+
+# Claims read by accounts.authentication.CachedJWTAuthentication
+USER_VERSION_CLAIM = "user_version"
+FLAG_CLAIMS = ("is_staff", "is_superuser")
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's permission flags and auth_version.
+    The access tokens made from it copy the claims, so most requests can be
+    authenticated without loading the user.
+
+    Refreshing rotates it, and the old token goes on the blacklist backend
+    of settings.TOKEN_BLACKLIST_BACKEND until it expires.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in FLAG_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[USER_VERSION_CLAIM] = user.auth_version
+        return token
+
+    def verify(self):
+        # Signature and expiry are checked first, forged tokens cost no lookup
+        super().verify()
+        if get_blacklist().contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        get_blacklist().add(
+            self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self["exp"])
+        )
@@ -1,13 +1,15 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth import authenticate, login
+from django.contrib.auth.models import update_last_login
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 import logging
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.authtoken.models import Token
 from .models import CustomUser
+from .tokens import UserRefreshToken
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -22,6 +24,14 @@ logger = logging.getLogger(__name__)
 CustomUser = get_user_model()
 
 
+def start_session(request, user):
+    # settings.LOGIN_SESSION off: JWT only, but last_login is still recorded
+    if settings.LOGIN_SESSION:
+        login(request, user)
+    else:
+        update_last_login(None, user)
+
+
 class UserListView(generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
@@ -34,10 +44,10 @@ class UserRegistrationView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         user = serializer.save()
-        login(self.request, user)
+        start_session(self.request, user)
 
         # Generate JWT-token
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         token, created = Token.objects.get_or_create(user=user)
         self.jwt_refresh = refresh
 
@@ -66,8 +76,8 @@ class UserLoginView(APIView):
             password=serializer.validated_data["password"],
         )
         if user is not None:
-            login(request, user)
-            refresh = RefreshToken.for_user(user)
+            start_session(request, user)
+            refresh = UserRefreshToken.for_user(user)
             return Response(
                 {
                     "refresh": str(refresh),
@@ -87,7 +97,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user only holds the token claims, see CachedJWTAuthentication
+        return CustomUser.objects.get(pk=self.request.user.pk)
 
 
 class ChangePasswordView(generics.UpdateAPIView):
@@ -95,7 +106,7 @@ class ChangePasswordView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        return CustomUser.objects.get(pk=self.request.user.pk)
 
     def update(self, request, *args, **kwargs):
         self.object = self.get_object()
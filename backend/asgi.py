@@ -3,6 +3,12 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+In production only the calendar stream (/api/calendar/stream/) is served
+from here, by the Procfile's ``stream`` process; the router sends that path
+to it and everything else to ``web`` (backend.wsgi). WhiteNoise and other
+middleware are sync only, so under ASGI every request would pass through a
+thread, which measured slower than WSGI (benchmarks/load_test.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -0,0 +1,502 @@
+"""
+Endpoint benchmarks: every named URL of the bookings and accounts apps is
+driven through the Django test client against data from bookings.seeding,
+and timed together with its query count and peak Python memory.
+
+Used by benchmarks/endpoints.py.
+"""
+
+import json
+import logging
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils.timezone import make_aware
+
+from accounts import urls as accounts_urls
+from accounts.tokens import UserRefreshToken
+from bookings import changes, seeding
+from bookings import urls as bookings_urls
+from bookings.models import Availability, Booking, Category, RecurringSchedule, Service
+
+# ``user`` is "anonymous", "user" or "admin". ``body`` is a dict sent as
+# JSON, or a callable returning multipart form data. Streams are opened but
+# not read, server-sent events never end.
+Scenario = namedtuple(
+    "Scenario",
+    ["name", "method", "user", "path", "body", "stream"],
+    defaults=[None, False],
+)
+
+
+def percentile(samples, fraction):
+    # Nearest rank on the sorted samples, like benchmarks/load_test.py
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+@contextmanager
+def seeded_database(**options):
+    """
+    Create a throwaway test database from the project settings, seed it with
+    ``options`` (see the seed_benchmark command) and drop it on exit. Like
+    the test runner this turns DEBUG off, so queries are not kept in memory.
+    """
+    setup_test_environment(debug=False)
+    test_database = connection.creation.create_test_db(verbosity=0)
+    try:
+        call_command("seed_benchmark", verbosity=0, **options)
+        yield
+    finally:
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+        teardown_test_environment()
+
+
+def fixtures():
+    # Rows of the seeded data the scenarios point at
+    User = get_user_model()
+    booking = Booking.objects.filter(
+        user__email__endswith=f"@{seeding.EMAIL_DOMAIN}"
+    ).latest("date_time")
+    first_day = Availability.objects.earliest("date").date
+    # The last seeded day has no bookings, the write scenarios book it
+    free_day = Availability.objects.latest("date").date
+    return {
+        "admin": User.objects.get(email=seeding.ADMIN_EMAIL),
+        "user": booking.user,
+        "booking": booking,
+        "services": list(
+            Service.objects.order_by("id").values_list("id", flat=True)[:2]
+        ),
+        "category": Category.objects.order_by("id").first(),
+        "availability": Availability.objects.earliest("date"),
+        "schedule": RecurringSchedule.objects.order_by("id").first(),
+        "first_day": first_day,
+        "free_day": free_day,
+        "free_start": make_aware(
+            datetime(free_day.year, free_day.month, free_day.day, 10)
+        ),
+    }
+
+
+def import_upload(data):
+    # A fresh three-row CSV on the free day for every request
+    start = data["free_start"]
+    rows = [
+        f"{data['user'].email},{start + timedelta(hours=hour)},{data['services'][0]}"
+        for hour in range(3)
+    ]
+    content = "\n".join(["user,date_time,services", *rows]).encode()
+    return {"file": SimpleUploadedFile("bookings.csv", content, "text/csv")}
+
+
+def scenarios(data):
+    service_id = data["services"][0]
+    first_day, last_day = data["first_day"], data["first_day"] + timedelta(days=6)
+    booking = {"pk": data["booking"].pk}
+    password = seeding.PASSWORD
+    return [
+        # accounts
+        Scenario(
+            "register",
+            "POST",
+            "anonymous",
+            reverse("register"),
+            {
+                "email": f"new@{seeding.EMAIL_DOMAIN}",
+                "password": password,
+                "name": "New",
+                "surname": "User",
+                "phone_number": "+46700000000",
+            },
+        ),
+        Scenario(
+            "login",
+            "POST",
+            "anonymous",
+            reverse("login"),
+            {"email": data["user"].email, "password": password},
+        ),
+        Scenario("profile", "GET", "user", reverse("profile")),
+        Scenario(
+            "change-password",
+            "PUT",
+            "user",
+            reverse("change-password"),
+            {"old_password": password, "new_password": password[::-1]},
+        ),
+        Scenario(
+            "delete-account",
+            "DELETE",
+            "user",
+            reverse("delete-account"),
+            {"password": password},
+        ),
+        Scenario("user-list", "GET", "admin", reverse("user-list")),
+        # catalogue
+        Scenario("category-list", "GET", "user", reverse("category-list")),
+        Scenario(
+            "category-detail",
+            "GET",
+            "user",
+            reverse("category-detail", kwargs={"pk": data["category"].pk}),
+        ),
+        Scenario(
+            "services-by-category",
+            "GET",
+            "user",
+            reverse(
+                "services-by-category", kwargs={"category_id": data["category"].pk}
+            ),
+        ),
+        Scenario("service-list", "GET", "user", reverse("service-list")),
+        Scenario(
+            "admin-service-list-create",
+            "GET",
+            "admin",
+            reverse("admin-service-list-create"),
+        ),
+        Scenario(
+            "admin-service-list-create:post",
+            "POST",
+            "admin",
+            reverse("admin-service-list-create"),
+            {"name": "Bench extra", "worktime": "00:30:00", "price": "30.00"},
+        ),
+        Scenario(
+            "admin-service-update-delete",
+            "GET",
+            "admin",
+            reverse("admin-service-update-delete", kwargs={"pk": service_id}),
+        ),
+        Scenario(
+            "admin-service-update-delete:patch",
+            "PATCH",
+            "admin",
+            reverse("admin-service-update-delete", kwargs={"pk": service_id}),
+            {"price": "99.00"},
+        ),
+        # bookings (user)
+        Scenario(
+            "booking-create",
+            "POST",
+            "user",
+            reverse("booking-create"),
+            {"service_ids": [service_id], "date_time": data["free_start"].isoformat()},
+        ),
+        Scenario("booking-list", "GET", "user", reverse("booking-list")),
+        Scenario("booking-list-all", "GET", "user", reverse("booking-list-all")),
+        Scenario(
+            "booking-detail", "GET", "user", reverse("booking-detail", kwargs=booking)
+        ),
+        Scenario(
+            "booking-edit", "GET", "user", reverse("booking-edit", kwargs=booking)
+        ),
+        Scenario(
+            "booking-edit:delete",
+            "DELETE",
+            "user",
+            reverse("booking-edit", kwargs=booking),
+        ),
+        Scenario(
+            "availability-free-slots",
+            "GET",
+            "user",
+            reverse("availability-free-slots")
+            + f"?date_from={first_day}&date_to={last_day}"
+            + f"&service_ids={','.join(map(str, data['services']))}",
+        ),
+        Scenario(
+            "availability-list-create",
+            "GET",
+            "user",
+            reverse("availability-list-create"),
+        ),
+        Scenario(
+            "calendar-changes",
+            "GET",
+            "user",
+            reverse("calendar-changes") + f"?since={changes.make_token(0)}",
+        ),
+        Scenario(
+            "calendar-stream", "GET", "user", reverse("calendar-stream"), stream=True
+        ),
+        Scenario(
+            "calendar-stream-ticket",
+            "POST",
+            "user",
+            reverse("calendar-stream-ticket"),
+            {},
+        ),
+        Scenario("async-booking-list", "GET", "user", reverse("async-booking-list")),
+        Scenario(
+            "async-booking-list-all", "GET", "user", reverse("async-booking-list-all")
+        ),
+        Scenario("async-service-list", "GET", "user", reverse("async-service-list")),
+        Scenario(
+            "async-availability-list", "GET", "user", reverse("async-availability-list")
+        ),
+        # bookings (admin)
+        Scenario(
+            "admin-booking-list-create",
+            "GET",
+            "admin",
+            reverse("admin-booking-list-create"),
+        ),
+        Scenario(
+            "admin-booking-list-create:post",
+            "POST",
+            "admin",
+            reverse("admin-booking-list-create"),
+            {
+                "user_id": data["user"].pk,
+                "service_ids": [service_id],
+                "date_time": data["free_start"].isoformat(),
+            },
+        ),
+        Scenario(
+            "admin-booking-export", "GET", "admin", reverse("admin-booking-export")
+        ),
+        Scenario(
+            "admin-booking-import",
+            "POST",
+            "admin",
+            reverse("admin-booking-import"),
+            lambda: import_upload(data),
+        ),
+        Scenario(
+            "admin-booking-update-delete",
+            "GET",
+            "admin",
+            reverse("admin-booking-update-delete", kwargs=booking),
+        ),
+        Scenario(
+            "admin-booking-update-delete:delete",
+            "DELETE",
+            "admin",
+            reverse("admin-booking-update-delete", kwargs=booking),
+        ),
+        Scenario(
+            "admin-availability-list-create",
+            "GET",
+            "admin",
+            reverse("admin-availability-list-create"),
+        ),
+        Scenario(
+            "admin-availability-list-create:post",
+            "POST",
+            "admin",
+            reverse("admin-availability-list-create"),
+            {
+                "date": (data["free_day"] + timedelta(days=1)).isoformat(),
+                "start_time": "08:00",
+                "end_time": "12:00",
+            },
+        ),
+        Scenario(
+            "admin-availability-update-delete",
+            "GET",
+            "admin",
+            reverse(
+                "admin-availability-update-delete",
+                kwargs={"pk": data["availability"].pk},
+            ),
+        ),
+        Scenario(
+            "admin-calendar",
+            "GET",
+            "admin",
+            reverse("admin-calendar") + f"?from={first_day}&to={last_day}",
+        ),
+        Scenario(
+            "admin-schedule-list-create",
+            "GET",
+            "admin",
+            reverse("admin-schedule-list-create"),
+        ),
+        Scenario(
+            "admin-schedule-list-create:post",
+            "POST",
+            "admin",
+            reverse("admin-schedule-list-create"),
+            {
+                "weekday": 0,
+                "start_time": "10:00",
+                "end_time": "14:00",
+                "start_date": (data["free_day"] + timedelta(days=7)).isoformat(),
+                "end_date": (data["free_day"] + timedelta(days=60)).isoformat(),
+            },
+        ),
+        Scenario(
+            "admin-schedule-update-delete",
+            "GET",
+            "admin",
+            reverse("admin-schedule-update-delete", kwargs={"pk": data["schedule"].pk}),
+        ),
+        Scenario(
+            "admin-schedule-generate",
+            "POST",
+            "admin",
+            reverse("admin-schedule-generate", kwargs={"pk": data["schedule"].pk}),
+            {},
+        ),
+    ]
+
+
+def over_budget(result, budget, latency=True):
+    # Why ``result`` (see measure()) exceeds ``budget``, empty when it does not
+    problems = []
+    if result["queries_max"] > budget["queries"]:
+        problems.append(f"{result['queries_max']} queries > {budget['queries']}")
+    if latency and result["p95_ms"] > budget["p95_ms"]:
+        problems.append(f"p95 {result['p95_ms']} ms > {budget['p95_ms']} ms")
+    return problems
+
+
+def uncovered(names):
+    # Named URLs of the two apps without a scenario in ``names``
+    covered = {name.split(":")[0] for name in names}
+    return sorted(
+        pattern.name
+        for module in (accounts_urls, bookings_urls)
+        for pattern in module.urlpatterns
+        if pattern.name and pattern.name not in covered
+    )
+
+
+def make_clients(data):
+    clients = {"anonymous": Client()}
+    for user in ("user", "admin"):
+        token = UserRefreshToken.for_user(data[user]).access_token
+        clients[user] = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return clients
+
+
+def send(client, scenario):
+    # HTTPS, production settings redirect plain requests
+    if callable(scenario.body):
+        response = client.post(scenario.path, scenario.body(), secure=True)
+    elif scenario.body is None:
+        response = client.generic(scenario.method, scenario.path, secure=True)
+    else:
+        response = client.generic(
+            scenario.method,
+            scenario.path,
+            json.dumps(scenario.body),
+            content_type="application/json",
+            secure=True,
+        )
+    if response.streaming and not scenario.stream:
+        b"".join(response.streaming_content)
+    elif response.streaming:
+        close_stream(response)
+    return response
+
+
+def close_stream(response):
+    # The test client closes every other response itself. Closing sends
+    # request_finished, which would also close the database connection, so
+    # the next request would pay for a new one (or, in a test, lose its
+    # transaction); the test client disconnects the receiver the same way
+    request_finished.disconnect(close_old_connections)
+    try:
+        response.close()
+    finally:
+        request_finished.connect(close_old_connections)
+
+
+def request(client, scenario):
+    # Writes are rolled back so every iteration sees the seeded data
+    if scenario.method == "GET":
+        return send(client, scenario)
+    with transaction.atomic():
+        response = send(client, scenario)
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(scenario, client, iterations, warmup):
+    for _ in range(warmup):
+        request(client, scenario)
+
+    latencies, queries, db, statuses = [], [], [], Counter()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = request(client, scenario)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(response.wsgi_request.timings.queries)
+        db.append(response.wsgi_request.timings.db * 1000)
+        statuses[response.status_code] += 1
+
+    # Traced separately, tracemalloc slows every allocation down
+    tracemalloc.start()
+    try:
+        request(client, scenario)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": scenario.name,
+        "method": scenario.method,
+        "path": scenario.path.split("?")[0],
+        "status": dict(sorted(statuses.items())),
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+        "queries": percentile(queries, 0.50),
+        "queries_max": max(queries),
+        "db_p50_ms": round(percentile(db, 0.50), 2),
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+@contextmanager
+def quiet():
+    # The per-request log lines of PerformanceMiddleware would drown the report
+    logger = logging.getLogger("backend.perf")
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def run(iterations=20, warmup=2, only=None):
+    """
+    Measure the scenarios named in ``only`` (default: all) on the current
+    database, which must hold the bookings.seeding data. Returns one dict
+    per scenario.
+    """
+    for alias in ("default", "catalogue", "auth"):
+        caches[alias].clear()
+    data = fixtures()
+    selected = [
+        scenario for scenario in scenarios(data) if not only or scenario.name in only
+    ]
+    results = []
+    with quiet():
+        for scenario in selected:
+            clients = make_clients(data)
+            results.append(
+                measure(scenario, clients[scenario.user], iterations, warmup)
+            )
+    return results
@@ -0,0 +1,223 @@
+import json
+import logging
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import perf
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+logger = logging.getLogger("backend.perf")
+
+# Brotli quality 4 compresses JSON better than gzip -6 at a similar CPU cost,
+# the high qualities are meant for precompressed static files
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+
+def accepted_encodings(header):
+    # Content codings from Accept-Encoding that the client did not refuse
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().partition("q=")[2]
+        try:
+            refused = quality != "" and float(quality) == 0
+        except ValueError:
+            refused = True
+        if coding and not refused:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def stream_compressor(encoding):
+    """
+    Return (compress_chunk, finish) for an incremental stream. Every chunk is
+    flushed, so clients receive the export rows as they are produced.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return (
+            lambda chunk: compressor.process(chunk) + compressor.flush(),
+            compressor.finish,
+        )
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return (
+        lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def compress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    for chunk in chunks:
+        if chunk:
+            yield compress_chunk(chunk)
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    async for chunk in chunks:
+        if chunk:
+            yield compress_chunk(chunk)
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with Brotli when it is installed and accepted, gzip
+    otherwise. settings.COMPRESSION_PREFIXES maps URL prefixes to the minimum
+    body size worth compressing; the longest matching prefix wins, None turns
+    compression off and paths outside every prefix are left alone. Streamed
+    responses are compressed chunk by chunk, event streams never.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefixes = sorted(
+            getattr(settings, "COMPRESSION_PREFIXES", {}).items(),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def min_size(self, path):
+        for prefix, min_size in self.prefixes:
+            if path.startswith(prefix):
+                return min_size
+        return None
+
+    def process_response(self, request, response):
+        min_size = self.min_size(request.path_info)
+        if min_size is None or response.has_header("Content-Encoding"):
+            return response
+        # Buffering inside the compressor would hold server-sent events back
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, encoding
+                )
+            # The compressed size is only known once the stream is done
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The body changed, so a strong ETag becomes weak (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class PerformanceMiddleware:
+    """
+    Time every request: SQL query count and time (through an execute
+    wrapper on each database connection, see backend.perf), serializers and
+    row builders, JSON rendering and the total. The numbers go out in a Server-Timing header and a JSON
+    log line on the "backend.perf" logger, and feed per-route histograms
+    that the perf_report command prints. The timings are also left on
+    request.timings for the endpoint benchmarks.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        perf.install_all()
+        timings = request.timings = perf.RequestTimings()
+        token = perf.current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            perf.current.reset(token)
+        return self.process_timings(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = request.timings = perf.RequestTimings()
+        token = perf.current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.current.reset(token)
+        return self.process_timings(request, response, timings)
+
+    def process_timings(self, request, response, timings):
+        total = timings.total
+        match = request.resolver_match
+        route = f"{request.method} /{match.route}" if match else "unmatched"
+
+        response.headers["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+                f"serialize;dur={timings.serialize * 1000:.1f}",
+                f"render;dur={timings.render * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                json.dumps(
+                    {
+                        "route": route,
+                        "path": request.path,
+                        "status": response.status_code,
+                        "total_ms": round(total * 1000, 1),
+                        "db_ms": round(timings.db * 1000, 1),
+                        "queries": timings.queries,
+                        "serialize_ms": round(timings.serialize * 1000, 1),
+                        "render_ms": round(timings.render * 1000, 1),
+                    }
+                )
+            )
+        perf.histograms.observe(route, timings, total)
+        return response
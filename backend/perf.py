@@ -0,0 +1,191 @@
+import os
+import socket
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Cache alias configured in settings.CACHES, shared by the workers on a host
+PERF_CACHE = "perf"
+WORKERS_KEY = "perf:workers"
+# Seconds between two snapshots of a worker's histograms, and how long the
+# snapshot of a worker that stopped is kept
+FLUSH_INTERVAL = 30
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+# Upper bounds (ms) of the request duration buckets, the last one is open
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Timings of the request being handled. Context variables follow the
+# request into sync_to_async threads, so queries made there are counted too
+current = ContextVar("perf_request", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("started", "queries", "db", "serialize", "serializing", "render")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.serializing = False
+        self.render = 0.0
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+
+def install_wrapper(sender, connection, **kwargs):
+    # Same hook as connection.execute_wrapper(), but kept for the lifetime of
+    # the connection: it is opened in whichever thread runs the query, which
+    # is not always the thread the middleware runs in
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_wrapper)
+
+
+def install_all():
+    # Connections of this thread opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(None, connection)
+
+
+@contextmanager
+def timer(name):
+    # Add the time spent in the block to the current request's ``name``
+    timings = current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, getattr(timings, name) + time.perf_counter() - started)
+
+
+@contextmanager
+def serialize_timer():
+    """
+    Add the time spent in the block to the current request's serialize
+    time, less the queries run meanwhile (a lazy queryset is often first
+    read by its serializer). Nested blocks are counted once, by the
+    outermost, so a serializer may use other timed serializers.
+    """
+    timings = current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+    timings.serializing = True
+    started, db = time.perf_counter(), timings.db
+    try:
+        yield
+    finally:
+        timings.serializing = False
+        elapsed = time.perf_counter() - started - (timings.db - db)
+        timings.serialize += max(elapsed, 0.0)
+
+
+def new_route():
+    return {
+        "count": 0,
+        "buckets": [0] * (len(BUCKETS) + 1),
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "db_ms": 0.0,
+        "queries": 0,
+        "serialize_ms": 0.0,
+        "render_ms": 0.0,
+    }
+
+
+def merge(into, route):
+    into["count"] += route["count"]
+    into["buckets"] = [a + b for a, b in zip(into["buckets"], route["buckets"])]
+    into["max_ms"] = max(into["max_ms"], route["max_ms"])
+    for field in ("total_ms", "db_ms", "queries", "serialize_ms", "render_ms"):
+        # Snapshots written before a field existed lack it
+        into[field] += route.get(field, 0)
+    return into
+
+
+def percentile(route, fraction):
+    # Upper bound of the bucket holding the percentile, None for the open one
+    target = fraction * route["count"]
+    seen = 0
+    for index, count in enumerate(route["buckets"]):
+        seen += count
+        if count and seen >= target:
+            return BUCKETS[index] if index < len(BUCKETS) else None
+    return None
+
+
+class RouteHistograms:
+    """
+    Per-route request histograms of one worker process. They are written
+    to the perf cache every FLUSH_INTERVAL seconds under a key of their own,
+    so workers never overwrite each other; read_all() merges them.
+    """
+
+    def __init__(self):
+        self.key = f"perf:routes:{socket.gethostname()}:{os.getpid()}"
+        self.routes = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, route, timings, total):
+        data = self.routes.setdefault(route, new_route())
+        total_ms = total * 1000
+        data["count"] += 1
+        data["buckets"][bisect_left(BUCKETS, total_ms)] += 1
+        data["total_ms"] += total_ms
+        data["max_ms"] = max(data["max_ms"], total_ms)
+        data["db_ms"] += timings.db * 1000
+        data["queries"] += timings.queries
+        data["serialize_ms"] += timings.serialize * 1000
+        data["render_ms"] += timings.render * 1000
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        cache = caches[PERF_CACHE]
+        cache.set(self.key, self.routes, timeout=SNAPSHOT_TIMEOUT)
+        workers = cache.get(WORKERS_KEY, set())
+        # Drop the workers whose snapshot expired while registering this one
+        alive = set(cache.get_many(workers)) | {self.key}
+        if alive != workers:
+            cache.set(WORKERS_KEY, alive, timeout=None)
+
+
+# One set per process, shared by every handler that loads the middleware
+histograms = RouteHistograms()
+
+
+def read_all():
+    # Merge the last snapshot of every worker, route -> histogram
+    cache = caches[PERF_CACHE]
+    merged = {}
+    for snapshot in cache.get_many(cache.get(WORKERS_KEY, set())).values():
+        for route, data in snapshot.items():
+            merge(merged.setdefault(route, new_route()), data)
+    return merged
@@ -0,0 +1,52 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import perf
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib renderer takes over
+    orjson = None
+
+# Everything orjson cannot encode natively (Decimal, timedelta, lazy strings,
+# querysets, ...) goes through DRF's encoder, so the output matches the
+# stdlib renderer. UTC datetimes end in "Z" like DRF writes them
+_default = JSONEncoder().default
+OPTIONS = orjson.OPT_UTC_Z if orjson else 0
+
+
+def dumps(data, indent=False):
+    """
+    Encode ``data`` to JSON bytes with orjson when it is installed, falling
+    back to the stdlib encoder with DRF's compact settings.
+    """
+    if orjson is None:
+        return JSONRenderer().render(
+            data, renderer_context={"indent": 2 if indent else None}
+        )
+    options = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+    try:
+        content = orjson.dumps(data, default=_default, option=options)
+    except orjson.JSONEncodeError:
+        # Non-string dict keys cost every dict some speed, so they are only
+        # allowed on the rare payload that needs them
+        content = orjson.dumps(
+            data, default=_default, option=options | orjson.OPT_NON_STR_KEYS
+        )
+    # Keep the output a strict JavaScript subset, like DRF's renderer does
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+        b"\xe2\x80\xa9", b"\\u2029"
+    )
+
+
+# JSONRenderer backed by orjson, the stdlib path is used when it is missing
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with perf.timer("render"):
+            if orjson is None:
+                return super().render(data, accepted_media_type, renderer_context)
+            if data is None:
+                return b""
+            renderer_context = renderer_context or {}
+            indent = self.get_indent(accepted_media_type, renderer_context)
+            return dumps(data, indent=bool(indent))
@@ -0,0 +1,9 @@
+from . import perf
+
+
+# Reports the time spent building a serializer's output as the request's
+# "serialize" timing (see backend.perf.serialize_timer), list or single
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with perf.serialize_timer():
+            return super().to_representation(instance)
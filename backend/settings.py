@@ -1,5 +1,7 @@
 from pathlib import Path
 import os
+import sys
+import tempfile
 from datetime import timedelta
 import dj_database_url
 
@@ -17,6 +19,9 @@ if os.getenv("DJANGO_DEVELOPMENT") == "True":
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # A file, unlike the default in-memory database, lets the
+            # threaded booking tests wait on each other's write lock
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 else:
@@ -62,11 +67,27 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication that skips the user query for current tokens
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DATETIME_FORMAT": None,
+    # orjson-backed JSON, falls back to the stdlib when orjson is missing
+    "DEFAULT_RENDERER_CLASSES": (
+        "backend.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "backend.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Used by bookings.pagination.BookingCursorPagination
+    "PAGE_SIZE": 100,
 }
 
+# PAGE_SIZE is only used by views that set pagination_class themselves
+SILENCED_SYSTEM_CHECKS = ["rest_framework.W001"]
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
@@ -75,6 +96,8 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.UserTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.UserTokenRefreshSerializer",
     "AUTH_COOKIE": "access_token",
     "AUTH_COOKIE_DOMAIN": None,
     "AUTH_COOKIE_SECURE": False,
@@ -83,6 +106,12 @@ SIMPLE_JWT = {
     "AUTH_COOKIE_SAMESITE": "Lax",
 }
 
+# Where rotated refresh tokens are kept until they expire, see accounts.blacklist.
+# `manage.py prune_token_blacklist` should run daily from the scheduler
+TOKEN_BLACKLIST_BACKEND = os.getenv(
+    "TOKEN_BLACKLIST_BACKEND", "accounts.blacklist.CachedBlacklist"
+)
+
 # Make Heroku & Cloudflare handle HTTPS correct
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = True
@@ -127,10 +156,12 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "backend.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "backend.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -139,6 +170,14 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# URL prefix -> smallest response body worth compressing, None skips the
+# prefix. Auth responses are small and carry tokens, so they stay plain
+COMPRESSION_PREFIXES = {
+    "/api/": 1024,
+    "/api/auth/": None,
+    "/api/accounts/": None,
+}
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -183,6 +222,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# New passwords are hashed with PASSWORD_HASHER: "scrypt", "argon2" (needs
+# argon2-cffi) or "pbkdf2", Django's default. Hashes of the other hashers
+# still verify and are replaced by the preferred one at the next login.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "scrypt")
+LOGIN_HASHERS = {
+    "scrypt": "accounts.hashers.TunedScryptPasswordHasher",
+    "argon2": "accounts.hashers.TunedArgon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    LOGIN_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in LOGIN_HASHERS.items() if name != PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+# Overrides of accounts.hashers.DEFAULT_COST, e.g. {"scrypt_work_factor": 2**15}
+PASSWORD_COST = {}
+# With False the login and registration views only return JWTs and skip
+# the session write, for clients that never use the session cookie
+LOGIN_SESSION = os.getenv("LOGIN_SESSION", "True") == "True"
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -212,6 +271,70 @@ WHITENOISE_ROOT = BASE_DIR / "staticfiles" / "build"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 
+# Caches
+# The catalogue (services and categories) is shared by all workers on a
+# host through the file-based backend, see bookings/catalogue.py
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalogue": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "CATALOGUE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nc-catalogue")
+        ),
+        "TIMEOUT": 60 * 60,
+    },
+    # Request histograms of every worker, read by `manage.py perf_report`
+    "perf": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "PERF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nc-perf")
+        ),
+    },
+    # Current auth_version of each user, see accounts.authentication
+    "auth": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "AUTH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nc-auth")
+        ),
+    },
+    # Refresh tokens blacklisted on this host, see accounts.blacklist.CachedBlacklist
+    "blacklist": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "BLACKLIST_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nc-blacklist")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+# One JSON line per request from backend.middleware.PerformanceMiddleware.
+# Only production logs them by default, development servers and test runs
+# would drown in them; PERF_LOG_LEVEL=INFO turns them on anywhere
+PERF_LOG_LEVEL = os.getenv(
+    "PERF_LOG_LEVEL",
+    "WARNING" if DEBUG or sys.argv[1:2] == ["test"] else "INFO",
+)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "backend.perf": {
+            "handlers": ["console"],
+            "level": PERF_LOG_LEVEL,
+            "propagate": False,
+        },
+    },
+}
+
+
+# Pub/sub feeding /api/calendar/stream/, see bookings/events.py
+CALENDAR_EVENTS_BROKER = "bookings.events.InProcessBroker"
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
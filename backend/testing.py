@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+# Every cache alias in memory, so test runs neither read nor clear the file
+# caches of a development server (user ids restart at 1 in the test database)
+isolated_caches = override_settings(
+    CACHES={
+        alias: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"test-{alias}",
+        }
+        for alias in settings.CACHES
+    }
+)
+
+
+def clear_caches():
+    # The in-memory caches outlive a test, its user ids do not
+    for cache in caches.all():
+        cache.clear()
@@ -0,0 +1,152 @@
+import gzip
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from uuid import UUID
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from bookings.models import Category
+
+from . import parsers, renderers
+from .middleware import CompressionMiddleware
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .testing import clear_caches, isolated_caches
+
+# Over the 1024 byte minimum of the /api/ prefix
+BODY = b'{"name":"Cut","worktime":"01:00:00"},' * 40
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def process(self, response, path="/api/services/"):
+        request = RequestFactory().get(path, headers={"accept-encoding": "gzip"})
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_bodies_under_the_minimum_size_stay_plain(self):
+        small = self.process(HttpResponse(BODY[:1000]))
+        large = self.process(HttpResponse(BODY))
+
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertEqual(large["Content-Encoding"], "gzip")
+        self.assertEqual(large["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(large.content), BODY)
+
+    def test_excluded_and_unlisted_prefixes_stay_plain(self):
+        for path in ("/api/auth/token/refresh/", "/admin/"):
+            with self.subTest(path):
+                response = self.process(HttpResponse(BODY), path)
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertEqual(response.content, BODY)
+
+    def test_streams_are_gzipped_chunk_by_chunk(self):
+        response = self.process(StreamingHttpResponse(iter([BODY[:500], BODY[500:]])))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), BODY)
+
+    async def test_async_streams_are_gzipped_chunk_by_chunk(self):
+        async def chunks():
+            yield BODY[:500]
+            yield BODY[500:]
+
+        response = self.process(StreamingHttpResponse(chunks()))
+        body = b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), BODY)
+
+    def test_event_streams_stay_plain(self):
+        response = self.process(
+            StreamingHttpResponse(
+                iter([b"data: {}\n\n"]), content_type="text/event-stream"
+            )
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_a_strong_etag_becomes_weak(self):
+        response = self.process(HttpResponse(BODY, headers={"ETag": '"v1"'}))
+
+        self.assertEqual(response["ETag"], 'W/"v1"')
+
+
+@isolated_caches
+class CompressedConditionalTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        Category.objects.bulk_create(
+            [Category(name=f"Category {index}") for index in range(60)]
+        )
+
+    def get(self, **headers):
+        return self.client.get(
+            reverse("category-list"),
+            secure=True,
+            headers={"accept-encoding": "gzip", **headers},
+        )
+
+    def test_the_weak_etag_of_a_compressed_list_revalidates(self):
+        response = self.get()
+        etag = response["ETag"]
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+
+# Values the API renders that JSON has no type for
+PAYLOAD = {
+    "price": Decimal("12.50"),
+    "date_time": datetime(2026, 11, 9, 9, 30, 15, 250000, tzinfo=timezone.utc),
+    "local": datetime(2026, 11, 9, 9, 30, tzinfo=timezone(timedelta(hours=2))),
+    "date": date(2026, 11, 9),
+    "worktime": timedelta(hours=1, minutes=30),
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "notes": "Zo\u00eb\u2028",
+    "services": [1, None, True],
+}
+
+
+class FastJSONTests(SimpleTestCase):
+    def render(self, data):
+        return FastJSONRenderer().render(data, "application/json")
+
+    def parse(self, body, encoding="utf-8"):
+        return FastJSONParser().parse(
+            BytesIO(body), parser_context={"encoding": encoding}
+        )
+
+    def test_orjson_output_matches_the_stdlib_renderer(self):
+        for data in (PAYLOAD, {1: "non-string key"}):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    self.render(data), JSONRenderer().render(data, "application/json")
+                )
+
+    def test_the_stdlib_takes_over_without_orjson(self):
+        expected = self.render(PAYLOAD)
+        with mock.patch.object(renderers, "orjson", None), mock.patch.object(
+            parsers, "orjson", None
+        ):
+            self.assertEqual(self.render(PAYLOAD), expected)
+            self.assertEqual(self.parse(b'{"ids": [1, 2]}'), {"ids": [1, 2]})
+            with self.assertRaises(ParseError):
+                self.parse(b"{")
+
+    def test_bodies_are_parsed_in_any_charset(self):
+        self.assertEqual(
+            self.parse('{"name": "Zo\u00eb"}'.encode()), {"name": "Zo\u00eb"}
+        )
+        self.assertEqual(
+            self.parse('{"name": "Zo\u00eb"}'.encode("latin-1"), "latin-1"),
+            {"name": "Zo\u00eb"},
+        )
+        with self.assertRaises(ParseError):
+            self.parse(b"{")
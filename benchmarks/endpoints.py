@@ -0,0 +1,96 @@
+"""
+Time every endpoint of the bookings and accounts apps on seeded data.
+
+Seeds a throwaway test database with the seed_benchmark command (fixed
+random seed, so every run sees the same rows) and drives each named URL
+through the Django test client:
+
+    DJANGO_DEVELOPMENT=True python benchmarks/endpoints.py --output before.json
+
+Prints one JSON document with latency percentiles, query counts and peak
+memory per endpoint, plus the commit and dataset, so runs can be diffed
+across commits. Writes are rolled back after every request.
+
+`manage.py check_budgets` runs the same scenarios against the query and
+p95 budgets in benchmarks/budgets.json and fails when one is exceeded.
+The query budgets are also checked by `manage.py test bookings`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from backend import benchmark  # noqa: E402
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--services", type=int, default=12)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--bookings", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--only", action="append", help="Scenario name, may be repeated."
+    )
+    parser.add_argument("--output", help="Write the report here instead of stdout.")
+    args = parser.parse_args()
+
+    dataset = {
+        "users": args.users,
+        "services": args.services,
+        "days": args.days,
+        "bookings": args.bookings,
+        "seed": args.seed,
+    }
+    with benchmark.seeded_database(**dataset):
+        results = benchmark.run(args.iterations, args.warmup, args.only)
+        uncovered = benchmark.uncovered(
+            scenario.name for scenario in benchmark.scenarios(benchmark.fixtures())
+        )
+
+    report = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "dataset": dataset,
+        "iterations": args.iterations,
+        "endpoints": results,
+        "not_covered": uncovered,
+    }
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(body + "\n")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
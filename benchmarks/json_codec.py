@@ -0,0 +1,90 @@
+"""
+Compare DRF's stdlib JSON renderer/parser with the orjson-backed ones.
+
+Seeds a throwaway test database like serialization.py, builds the real
+booking list payloads once and then times only the encoding and decoding:
+
+    DJANGO_DEVELOPMENT=True python benchmarks/json_codec.py --rows 10000
+
+Prints one JSON object per (payload, codec) with the best of --repeat runs.
+"""
+
+import argparse
+import io
+import json
+import time
+
+from serialization import seed  # also sets up Django
+
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from backend.parsers import FastJSONParser
+from backend.renderers import FastJSONRenderer
+from bookings import compact
+from bookings.models import Booking
+from bookings.serializers import AdminBookingSerializer
+
+
+def payloads():
+    bookings = Booking.objects.order_by("date_time", "id")
+    records = compact.user_booking_records(bookings)
+    user_rows = compact.user_booking_rows(list(records), records, False)
+    records = compact.admin_booking_records(bookings)
+    admin_rows = compact.admin_booking_rows(list(records), records)
+    return {
+        # worktime is a raw timedelta here, the slow case for the stdlib
+        "anonymized": compact.shape(*user_rows, False),
+        "admin": AdminBookingSerializer(bookings.with_details(), many=True).data,
+        "admin/columnar": compact.shape(*admin_rows, True),
+    }
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    test_database = connection.creation.create_test_db(verbosity=0)
+    try:
+        call_command("flush", interactive=False, verbosity=0)
+        seed(args.rows)
+        built = payloads()
+    finally:
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+
+    codecs = {
+        "stdlib": (JSONRenderer(), JSONParser()),
+        "orjson": (FastJSONRenderer(), FastJSONParser()),
+    }
+    for name, data in built.items():
+        body = JSONRenderer().render(data)
+        for codec, (renderer, body_parser) in codecs.items():
+            result = {
+                "payload": name,
+                "codec": codec,
+                "rows": args.rows,
+                "bytes": len(body),
+                "render_seconds": best_of(args.repeat, lambda: renderer.render(data)),
+                "parse_seconds": best_of(
+                    args.repeat, lambda: body_parser.parse(io.BytesIO(body))
+                ),
+                "identical": renderer.render(data) == body,
+            }
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+HTTP load generator for comparing the WSGI and ASGI deployments.
+
+The Procfile serves the API from WSGI and only the calendar stream from
+ASGI; for the comparison start both servers by hand against the same
+database, e.g.
+
+    gunicorn backend.wsgi -w 4 -b 127.0.0.1:8001
+    gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker \\
+        -w 4 -b 127.0.0.1:8002
+
+then compare an endpoint with its async twin:
+
+    python benchmarks/load_test.py --token <access> --concurrency 200 \\
+        http://127.0.0.1:8001/api/bookings/all/ \\
+        http://127.0.0.1:8002/api/async/bookings/all/
+
+Prints one JSON object per URL with requests/sec and latency percentiles.
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+
+def run(url, token, concurrency, total, timeout):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    connection_class = (
+        http.client.HTTPSConnection
+        if parts.scheme == "https"
+        else http.client.HTTPConnection
+    )
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        connection = connection_class(parts.netloc, timeout=timeout)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = connection_class(parts.netloc, timeout=timeout)
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                if failed:
+                    errors[0] += 1
+                else:
+                    latencies.append(elapsed)
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors[0],
+        "seconds": round(duration, 3),
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("urls", nargs="+", help="Endpoints to load, run in turn.")
+    parser.add_argument("--token", help="JWT access token sent as Bearer.")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    for url in args.urls:
+        result = run(url, args.token, args.concurrency, args.requests, args.timeout)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
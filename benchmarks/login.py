@@ -0,0 +1,120 @@
+"""
+Measure logins per second of one worker for each password hasher, with
+and without the session write.
+
+Seeds a throwaway test database with one user, stores its password with
+the hasher of each case and posts to /api/accounts/login/ in a loop:
+
+    DJANGO_DEVELOPMENT=True python benchmarks/login.py --logins 50
+
+Prints one JSON object per case. "pbkdf2/session" is Django's default and
+the login path before PASSWORD_HASHER and LOGIN_SESSION existed. The
+"rehash" line checks that a login with a PBKDF2 hash stored moves it to
+the preferred hasher.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from backend import benchmark  # noqa: E402
+from bookings import seeding  # noqa: E402
+
+CASES = [
+    ("pbkdf2", True),
+    ("scrypt", True),
+    ("scrypt", False),
+    ("argon2", True),
+    ("argon2", False),
+]
+
+
+def hashers(preferred):
+    # Same order settings.py builds for PASSWORD_HASHER=preferred
+    paths = settings.LOGIN_HASHERS
+    return [paths[preferred], *(p for n, p in paths.items() if n != preferred)]
+
+
+def available(name):
+    # Argon2PasswordHasher needs argon2-cffi
+    return name != "argon2" or importlib.util.find_spec("argon2") is not None
+
+
+def login(client, email):
+    response = client.post(
+        reverse("login"),
+        {"email": email, "password": seeding.PASSWORD},
+        content_type="application/json",
+        secure=True,
+    )
+    assert response.status_code == 200, response.content
+    return response
+
+
+def measure(name, session, email, logins):
+    user = get_user_model().objects.get(email=email)
+    with override_settings(PASSWORD_HASHERS=hashers(name), LOGIN_SESSION=session):
+        user.password = make_password(seeding.PASSWORD)
+        user.save(update_fields=["password"])
+        client = Client()
+        login(client, email)
+        started = time.perf_counter()
+        for _ in range(logins):
+            login(client, email)
+        elapsed = time.perf_counter() - started
+    return {
+        "hasher": name,
+        "session": session,
+        "logins": logins,
+        "ms_per_login": round(elapsed / logins * 1000, 1),
+        "logins_per_second": round(logins / elapsed, 1),
+    }
+
+
+def rehash(email):
+    # A PBKDF2 hash left from before the switch is replaced on login
+    user = get_user_model().objects.get(email=email)
+    user.password = make_password(seeding.PASSWORD, hasher="pbkdf2_sha256")
+    user.save(update_fields=["password"])
+    login(Client(), email)
+    user.refresh_from_db(fields=["password"])
+    return {
+        "rehash": "pbkdf2_sha256",
+        "preferred": settings.PASSWORD_HASHER,
+        "stored_after_login": user.password.split("$", 1)[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    email = seeding.user_email(0)
+    with benchmark.seeded_database(users=1, services=1, days=2, bookings=0):
+        for name, session in CASES:
+            if not available(name):
+                print(json.dumps({"hasher": name, "skipped": "not installed"}))
+                continue
+            print(json.dumps(measure(name, session, email, args.logins)), flush=True)
+        print(json.dumps(rehash(email)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Compare the booking list serializers on seeded data.
+
+Runs against a throwaway test database created from the project settings
+(SQLite in development), seeds the requested number of bookings and times
+each way of turning them into a rendered JSON body:
+
+    DJANGO_DEVELOPMENT=True python benchmarks/serialization.py \\
+        --rows 10000 100000 1000000
+
+Prints one JSON object per (rows, case) with the best of --repeat runs and
+the size of the rendered body.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils.timezone import make_aware  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from bookings import compact  # noqa: E402
+from bookings.models import Booking, Service  # noqa: E402
+from bookings.serializers import (  # noqa: E402
+    AdminBookingSerializer,
+    anonymized_booking_data,
+)
+
+BATCH_SIZE = 5000
+
+
+def seed(rows, users=50, services=10):
+    # Back-to-back bookings with one to three services each
+    rng = random.Random(0)
+    user_ids = [
+        get_user_model()
+        .objects.create_user(
+            f"bench{i}@example.com", password=None, name="Bench", surname=str(i)
+        )
+        .id
+        for i in range(users)
+    ]
+    catalogue = Service.objects.bulk_create(
+        [
+            Service(name=f"Service {i}", worktime=timedelta(minutes=15 * (i % 4 + 1)))
+            for i in range(services)
+        ]
+    )
+    through = Booking.services.through
+    start = make_aware(datetime(2030, 1, 1, 8))
+    for offset in range(0, rows, BATCH_SIZE):
+        chosen, bookings = [], []
+        for index in range(offset, min(offset + BATCH_SIZE, rows)):
+            picked = rng.sample(catalogue, rng.randint(1, 3))
+            worktime = sum((service.worktime for service in picked), timedelta())
+            date_time = start + timedelta(hours=2 * index)
+            chosen.append(picked)
+            bookings.append(
+                Booking(
+                    user_id=rng.choice(user_ids),
+                    date_time=date_time,
+                    end_time=date_time + worktime,
+                    total_worktime=worktime,
+                    notes="",
+                )
+            )
+        created = Booking.objects.bulk_create(bookings)
+        through.objects.bulk_create(
+            [
+                through(booking_id=booking.id, service_id=service.id)
+                for booking, picked in zip(created, chosen)
+                for service in picked
+            ]
+        )
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def anonymized_models(bookings):
+    return render(
+        [
+            anonymized_booking_data(booking, booking.services.all())
+            for booking in bookings.prefetch_related("services")
+        ]
+    )
+
+
+def anonymized_compact(bookings, columnar):
+    records = compact.user_booking_records(bookings)
+    columns, rows, services = compact.user_booking_rows(list(records), records, False)
+    return render(compact.shape(columns, rows, services, columnar))
+
+
+def admin_serializer(bookings):
+    return render(AdminBookingSerializer(bookings.with_details(), many=True).data)
+
+
+def admin_compact(bookings, columnar):
+    records = compact.admin_booking_records(bookings)
+    columns, rows, services = compact.admin_booking_rows(list(records), records)
+    return render(compact.shape(columns, rows, services, columnar))
+
+
+CASES = {
+    "anonymized/models": anonymized_models,
+    "anonymized/compact": lambda bookings: anonymized_compact(bookings, False),
+    "anonymized/columnar": lambda bookings: anonymized_compact(bookings, True),
+    "admin/serializer": admin_serializer,
+    "admin/compact": lambda bookings: admin_compact(bookings, False),
+    "admin/columnar": lambda bookings: admin_compact(bookings, True),
+}
+
+
+def measure(case, rows, repeat):
+    bookings = Booking.objects.order_by("date_time", "id")
+    best, size = None, 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(CASES[case](bookings))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "rows": rows,
+        "case": case,
+        "seconds": round(best, 4),
+        "rows_per_second": round(rows / best),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--case", choices=sorted(CASES), action="append")
+    args = parser.parse_args()
+
+    test_database = connection.creation.create_test_db(verbosity=0)
+    try:
+        for rows in args.rows:
+            # Start every size from an empty database so they are seeded alike
+            call_command("flush", interactive=False, verbosity=0)
+            seed(rows)
+            for case in args.case or CASES:
+                print(json.dumps(measure(case, rows, args.repeat)), flush=True)
+    finally:
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Service, Booking, Availability, Category
+from .models import Service, Booking, Availability, Category, RecurringSchedule
+from .schedules import generate_availability
 
 
 # Admin panel for the Category model
@@ -33,17 +34,11 @@ class BookingAdmin(admin.ModelAdmin):
         "end_time",
         "created_at",
         "get_services",
-        "notes",  
+        "notes",
     ]
     list_filter = ["date_time"]  # Filter by date
     search_fields = ["user__username"]  # Search by username
 
-    # Calculate and display the end time for each booking
-    def end_time(self, obj):
-        return obj.calculate_end_time()
-
-    end_time.short_description = "End Time"
-
     # Display the services selected in the booking
     def get_services(self, obj):
         return ", ".join([service.name for service in obj.services.all()])
@@ -62,3 +57,20 @@ class AvailabilityAdmin(admin.ModelAdmin):
     ]
     list_filter = ["date", "is_available"]
     search_fields = ["date"]
+
+
+# Admin panel for the RecurringSchedule model
+@admin.register(RecurringSchedule)
+class RecurringScheduleAdmin(admin.ModelAdmin):
+    list_display = ["weekday", "start_time", "end_time", "start_date", "end_date"]
+    list_filter = ["weekday"]
+    actions = ["generate"]
+
+    # Expand the selected schedules into availability
+    @admin.action(description="Generate availability")
+    def generate(self, request, queryset):
+        total = 0
+        for schedule in queryset:
+            created, _ = generate_availability(schedule)
+            total += created
+        self.message_user(request, f"Created {total} availability slots.")
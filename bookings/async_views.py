@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.authentication import (
+    CachedJWTAuthentication,
+    acurrent_version,
+    claims_user,
+    trusts_claims,
+)
+from accounts.tokens import USER_VERSION_CLAIM
+from backend import perf
+from backend.renderers import dumps
+
+from . import catalogue
+from .conditional import aget_watermark, evaluate_watermark, tag_response
+from .filters import filter_date_window
+from .models import Availability, Booking, Service
+from .pagination import BookingCursorPagination
+from .serializers import (
+    AvailabilitySerializer,
+    ServiceSerializer,
+    anonymized_booking_data,
+    user_booking_data,
+)
+
+# Async twins of the read-heavy list endpoints, for comparing the WSGI and
+# ASGI deployments (benchmarks/load_test.py); production serves the DRF
+# views from WSGI. DRF views are sync only, so these are plain Django async
+# views that use the async ORM and return the same payloads as the DRF ones.
+
+CustomUser = get_user_model()
+
+
+def api_response(data, status=200):
+    # Same encoder as the DRF renderer, so the payloads match the sync views
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+async def authenticate(request):
+    """
+    Return the active user for the request's JWT, or None. Token validation
+    is CPU only; the user is built from the claims while their version is
+    current (see CachedJWTAuthentication), loaded with an async query if not.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    if trusts_claims(token):
+        version = await acurrent_version(token[api_settings.USER_ID_CLAIM])
+        if token[USER_VERSION_CLAIM] == version:
+            return claims_user(token)
+    return await CustomUser.objects.filter(
+        **{api_settings.USER_ID_FIELD: token.get(api_settings.USER_ID_CLAIM)},
+        is_active=True,
+    ).afirst()
+
+
+def async_api_view(view):
+    # Authenticate, then map validation errors to 400 the way DRF does
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return api_response({"detail": "Method not allowed."}, status=405)
+        user = await authenticate(request)
+        if user is None:
+            return api_response(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        try:
+            return await view(request, user, *args, **kwargs)
+        except serializers.ValidationError as exc:
+            return api_response(exc.detail, status=400)
+
+    return wrapper
+
+
+async def conditional(request, user, queryset, build):
+    etag, timestamp, response = evaluate_watermark(
+        request, user, await aget_watermark(queryset)
+    )
+    if response is None:
+        response = api_response(await build())
+    return tag_response(response, etag, timestamp)
+
+
+async def services_by_booking(booking_ids):
+    # One query for the services of all bookings (aiterator cannot prefetch)
+    services = {booking_id: [] for booking_id in booking_ids}
+    through = Booking.services.through.objects.filter(
+        booking_id__in=booking_ids
+    ).select_related("service")
+    async for row in through.aiterator():
+        services[row.booking_id].append(row.service)
+    return services
+
+
+async def booking_rows(request, bookings, make_row):
+    # One cursor page, like BookingCursorPagination on the DRF list views
+    paginator = BookingCursorPagination()
+    page = await paginator.apaginate_queryset(bookings, Request(request))
+    services = await services_by_booking([booking.id for booking in page])
+    with perf.serialize_timer():
+        rows = [make_row(booking, services[booking.id]) for booking in page]
+    return paginator.get_paginated_response(rows).data
+
+
+# List User Bookings (USER, async)
+@async_api_view
+async def booking_list(request, user):
+    bookings = filter_date_window(
+        Booking.objects.filter(user=user).order_by("date_time", "id"), request.GET
+    )
+    return await conditional(
+        request,
+        user,
+        bookings,
+        lambda: booking_rows(request, bookings, user_booking_data),
+    )
+
+
+# List ALL Bookings w/o User Details, Excluding current user's own (USER, async)
+@async_api_view
+async def all_bookings_list(request, user):
+    bookings = filter_date_window(
+        Booking.objects.exclude(user=user).order_by("date_time", "id"), request.GET
+    )
+    return await conditional(
+        request,
+        user,
+        bookings,
+        lambda: booking_rows(request, bookings, anonymized_booking_data),
+    )
+
+
+# List Availability Slots (USER, async)
+@async_api_view
+async def availability_list(request, user):
+    availability = Availability.objects.all()
+
+    async def build():
+        rows = [avail async for avail in availability.aiterator()]
+        return AvailabilitySerializer(rows, many=True).data
+
+    return await conditional(request, user, availability, build)
+
+
+# List Available Services (USER, async), shares the catalogue cache
+@async_api_view
+async def service_list(request, user):
+    async def build():
+        rows = [service async for service in Service.objects.aiterator()]
+        return catalogue.plain_data(ServiceSerializer(rows, many=True).data)
+
+    etag, data = await catalogue.aget_or_build("services", build)
+    if catalogue.is_fresh(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = api_response(data)
+    response.headers["ETag"] = etag
+    return response
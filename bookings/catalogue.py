@@ -0,0 +1,107 @@
+import hashlib
+import json
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Cache alias configured in settings.CACHES
+CATALOGUE_CACHE = "catalogue"
+VERSION_KEY = "catalogue:version"
+
+
+def get_cache():
+    return caches[CATALOGUE_CACHE]
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() keeps the first version if another worker got there first
+        cache.add(VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    # Entries are keyed by version, so a new version orphans all of them
+    get_cache().set(VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return f'"{hashlib.sha256(payload.encode()).hexdigest()}"'
+
+
+def plain_data(data):
+    # Plain JSON types keep the entry picklable for any cache backend
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def get_or_build(name, build):
+    """
+    Return (etag, data) for the catalogue entry ``name``, calling ``build``
+    to produce the data when the current version is not cached yet.
+    """
+    cache = get_cache()
+    key = f"catalogue:{get_version()}:{name}"
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        entry = (make_etag(data), data)
+        cache.set(key, entry)
+    return entry
+
+
+async def aget_version():
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, uuid4().hex, timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def aget_or_build(name, abuild):
+    # Async twin of get_or_build(), ``abuild`` is a coroutine function
+    cache = get_cache()
+    key = f"catalogue:{await aget_version()}:{name}"
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await abuild()
+        entry = (make_etag(data), data)
+        await cache.aset(key, entry)
+    return entry
+
+
+def is_fresh(request, etag):
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    return etag in {
+        tag.removeprefix("W/")
+        for tag in parse_etags(request.headers.get("If-None-Match", ""))
+    }
+
+
+# Serve a list view from the catalogue cache with a strong ETag
+class CatalogueCacheMixin:
+    catalogue_name = None
+
+    def get_catalogue_name(self):
+        return self.catalogue_name
+
+    def build_catalogue(self):
+        serializer = self.get_serializer(
+            self.filter_queryset(self.get_queryset()), many=True
+        )
+        return plain_data(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        etag, data = get_or_build(self.get_catalogue_name(), self.build_catalogue)
+
+        if is_fresh(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(data, headers={"ETag": etag})
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+from .models import CalendarChange
+
+# Changes older than this are pruned, tokens older than this are refused
+RETENTION = timedelta(days=7)
+# Change ids are handed out at insert time but become visible at commit, so
+# a transaction can commit id N after another one committed N + 1. Sync
+# tokens only move past changes older than this, newer ones are sent again
+# on the next poll; it must exceed the longest transaction that logs changes
+SETTLE_TIME = timedelta(seconds=30)
+
+signer = signing.TimestampSigner(salt="bookings.calendar-changes")
+
+
+def make_token(change_id):
+    return signer.sign(str(change_id))
+
+
+def read_token(token):
+    """
+    Return the change id stored in ``token``. Raises signing.SignatureExpired
+    when the token predates the retention window and signing.BadSignature
+    when it was tampered with.
+    """
+    return int(signer.unsign(token, max_age=RETENTION))
+
+
+def settled_change_id():
+    # Highest committed id below every change younger than SETTLE_TIME
+    unsettled = (
+        CalendarChange.objects.filter(created_at__gt=timezone.now() - SETTLE_TIME)
+        .order_by("id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    settled = CalendarChange.objects.order_by("-id").values_list("id", flat=True)
+    if unsettled is not None:
+        settled = settled.filter(id__lt=unsettled)
+    return settled.first() or 0
+
+
+def record(model, object_ids, action):
+    CalendarChange.objects.bulk_create(
+        [
+            CalendarChange(model=model, object_id=object_id, action=action)
+            for object_id in object_ids
+        ]
+    )
+
+
+def log(model, object_ids, action):
+    # Write the change log and push the event to live calendars once committed
+    object_ids = list(object_ids)
+    record(model, object_ids, action)
+    transaction.on_commit(
+        lambda: events.publish({"model": model, "ids": object_ids, "action": action})
+    )
+
+
+def collect(since, limit=500):
+    """
+    Read up to ``limit`` changes after ``since`` and fold them into the latest
+    action per object. Returns (actions, cursor, has_more), where ``actions``
+    maps (model, object_id) to the last action seen.
+
+    ``cursor`` stops before the first change younger than SETTLE_TIME, so a
+    change committed late with a lower id is still read by the next poll.
+    The younger changes are in ``actions`` all the same and come again with
+    the next poll, which clients apply as the same upsert or tombstone.
+    """
+    changes = list(
+        CalendarChange.objects.filter(id__gt=since)
+        .order_by("id")
+        .values_list("id", "model", "object_id", "action", "created_at")[: limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    settled = timezone.now() - SETTLE_TIME
+    actions = {}
+    cursor = since
+    settling = False
+    for change_id, model, object_id, action, created_at in changes:
+        actions[(model, object_id)] = action
+        settling = settling or created_at > settled
+        if not settling:
+            cursor = change_id
+    if settling:
+        # Asking for more at once would only read the same changes again
+        has_more = False
+    return actions, cursor, has_more
+
+
+def prune(older_than=RETENTION):
+    cutoff = timezone.now() - older_than
+    deleted, _ = CalendarChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,200 @@
+from datetime import timedelta
+
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from backend import perf
+
+from .models import Booking, Service
+from .renderers import ColumnarJSONRenderer
+from .serializers import ServiceSerializer
+
+# Columns of the compact booking/availability lists, in the order the
+# per-row payloads have always used
+ANONYMIZED_BOOKING_COLUMNS = ("date_time", "end_time", "services")
+USER_BOOKING_COLUMNS = ANONYMIZED_BOOKING_COLUMNS + ("id", "created_at")
+ADMIN_BOOKING_COLUMNS = (
+    "id",
+    "services",
+    "user",
+    "user_name",
+    "date_time",
+    "end_time",
+    "created_at",
+    "notes",
+)
+AVAILABILITY_COLUMNS = ("id", "date", "start_time", "end_time", "is_available")
+
+
+def service_ids_by_booking(records, bookings=None):
+    """
+    Map booking id -> service ids from the through table in one query. The
+    rows are restricted by ``bookings`` as a subquery when the whole list is
+    returned, otherwise by the ids of the paginated ``records``.
+    """
+    if bookings is not None:
+        booking_ids = bookings.values("id")
+    else:
+        booking_ids = [record.id for record in records]
+    service_ids = {}
+    for booking_id, service_id in Booking.services.through.objects.filter(
+        booking_id__in=booking_ids
+    ).values_list("booking_id", "service_id"):
+        service_ids.setdefault(booking_id, []).append(service_id)
+    return service_ids
+
+
+def user_service_lookup():
+    # One {"name", "worktime"} entry per service, shared by every row using it
+    lookup, worktimes = {}, {}
+    for service_id, name, worktime in Service.objects.values_list(
+        "id", "name", "worktime"
+    ):
+        lookup[service_id] = {"name": name, "worktime": worktime}
+        worktimes[service_id] = worktime
+    return lookup, worktimes
+
+
+def admin_service_lookup():
+    # ServiceSerializer output per service, serialized once per response
+    services = list(Service.objects.all())
+    lookup = {
+        entry["id"]: entry for entry in ServiceSerializer(services, many=True).data
+    }
+    return lookup, {service.id: service.worktime for service in services}
+
+
+def end_time_of(date_time, end_time, service_ids, worktimes):
+    # Rows that are not backfilled yet fall back to the services, like
+    # Booking.calculate_end_time()
+    if end_time is not None:
+        return end_time
+    return date_time + sum((worktimes[i] for i in service_ids), timedelta())
+
+
+def user_booking_rows(records, bookings, private):
+    """
+    Rows for the user booking lists from user_booking_records(). ``private``
+    adds the id and created_at columns shown on the user's own bookings.
+    """
+    lookup, worktimes = user_service_lookup()
+    service_ids = service_ids_by_booking(records, bookings)
+    rows = []
+    for record in records:
+        ids = service_ids.get(record.id, [])
+        row = (
+            record.date_time.isoformat(),
+            end_time_of(record.date_time, record.end_time, ids, worktimes).isoformat(),
+            ids,
+        )
+        rows.append(row + (record.id, record.created_at) if private else row)
+    columns = USER_BOOKING_COLUMNS if private else ANONYMIZED_BOOKING_COLUMNS
+    return columns, rows, lookup
+
+
+def admin_booking_rows(records, bookings):
+    # Rows for the admin booking list from admin_booking_records()
+    lookup, worktimes = admin_service_lookup()
+    service_ids = service_ids_by_booking(records, bookings)
+    rows = []
+    for record in records:
+        ids = service_ids.get(record.id, [])
+        rows.append(
+            (
+                record.id,
+                ids,
+                record.user_id,
+                f"{record.user__name} {record.user__surname}",
+                record.date_time,
+                end_time_of(
+                    record.date_time, record.end_time, ids, worktimes
+                ).isoformat(),
+                record.created_at,
+                record.notes,
+            )
+        )
+    return ADMIN_BOOKING_COLUMNS, rows, lookup
+
+
+def user_booking_records(bookings):
+    return bookings.values_list("id", "date_time", "end_time", "created_at", named=True)
+
+
+def admin_booking_records(bookings):
+    return bookings.values_list(
+        "id",
+        "user_id",
+        "user__name",
+        "user__surname",
+        "date_time",
+        "end_time",
+        "created_at",
+        "notes",
+        named=True,
+    )
+
+
+def availability_rows(records, availability):
+    return AVAILABILITY_COLUMNS, [tuple(record) for record in records], None
+
+
+def availability_records(availability):
+    return availability.values_list(*AVAILABILITY_COLUMNS, named=True)
+
+
+def shape(columns, rows, services, columnar):
+    """
+    Lay the rows out as a list of objects, or with ``columnar`` as one array
+    per column. Rows keep service ids in their "services" column; objects get
+    the shared service entries, the columnar form lists them once under
+    "services".
+    """
+    if columnar:
+        data = {
+            "count": len(rows),
+            "columns": {
+                column: list(values)
+                for column, values in zip(
+                    columns, zip(*rows) if rows else [[]] * len(columns)
+                )
+            },
+        }
+        if services is not None:
+            used = {i for ids in data["columns"]["services"] for i in ids}
+            data["services"] = {str(i): services[i] for i in sorted(used)}
+        return data
+
+    if services is None:
+        return [dict(zip(columns, row)) for row in rows]
+    index = columns.index("services")
+    objects = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        item["services"] = [services[i] for i in row[index]]
+        objects.append(item)
+    return objects
+
+
+# List views answered from values_list() records instead of model instances,
+# as a list of objects or, with ?format=columnar, one array per column
+class CompactListMixin:
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+
+    def compact_list(self, records, build_rows):
+        """
+        Paginate ``records`` when the view has a paginator, then turn them
+        into (columns, rows, services) with ``build_rows(records, queryset)``
+        and shape them. ``queryset`` is None for a page, so lookups go by the
+        ids on the page instead of a subquery over the whole list.
+        """
+        page = self.paginate_queryset(records)
+        columnar = self.request.accepted_renderer.format == ColumnarJSONRenderer.format
+        with perf.serialize_timer():
+            if page is None:
+                columns, rows, services = build_rows(list(records), records)
+            else:
+                columns, rows, services = build_rows(page, None)
+            data = shape(columns, rows, services, columnar)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
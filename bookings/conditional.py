@@ -0,0 +1,96 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Booking, CalendarChange, Service
+
+# Aggregate evaluated on the filtered queryset: its row count and newest
+# updated_at. Deleting a row lowers the count, so the ETag still changes
+# even though updated_at cannot; get_watermark() adds the newest deletion
+# so that Last-Modified moves too
+WATERMARK = {"count": Count("id"), "last_modified": Max("updated_at")}
+# Timestamps of a watermark, Last-Modified is the newest of them
+STAMPS = ("last_modified", "deleted_at", "services_at")
+
+
+def deletions(queryset):
+    # Deletions of the listed model in the change log
+    return CalendarChange.objects.filter(
+        model=(
+            CalendarChange.BOOKING
+            if queryset.model is Booking
+            else CalendarChange.AVAILABILITY
+        ),
+        action=CalendarChange.DELETED,
+    )
+
+
+def get_watermark(queryset):
+    """
+    Return the list's watermark: the count and newest updated_at of its
+    rows, the newest deletion of its model and, for bookings, the newest
+    service change.
+    """
+    watermark = queryset.order_by().aggregate(**WATERMARK)
+    watermark.update(deletions(queryset).aggregate(deleted_at=Max("created_at")))
+    watermark["services_at"] = None
+    if queryset.model is Booking:
+        # Booking rows embed the names and worktimes of their services
+        watermark.update(Service.objects.aggregate(services_at=Max("updated_at")))
+    return watermark
+
+
+async def aget_watermark(queryset):
+    watermark = await queryset.order_by().aaggregate(**WATERMARK)
+    watermark.update(await deletions(queryset).aaggregate(deleted_at=Max("created_at")))
+    watermark["services_at"] = None
+    if queryset.model is Booking:
+        watermark.update(
+            await Service.objects.aaggregate(services_at=Max("updated_at"))
+        )
+    return watermark
+
+
+def evaluate_watermark(request, user, watermark):
+    """
+    Turn a watermark into (etag, timestamp, not_modified), where
+    ``not_modified`` is a 304 response when the client's copy is current.
+    """
+    stamps = [watermark[name] for name in STAMPS]
+    last_modified = max(filter(None, stamps), default=None)
+    key = "|".join(
+        [
+            request.get_full_path(),
+            str(user.pk),
+            str(watermark["count"]),
+            *(stamp.isoformat() if stamp else "" for stamp in stamps),
+        ]
+    )
+    etag = f'"{hashlib.sha256(key.encode()).hexdigest()}"'
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    return etag, timestamp, not_modified
+
+
+def tag_response(response, etag, timestamp):
+    response.headers["ETag"] = etag
+    if timestamp is not None:
+        response.headers["Last-Modified"] = http_date(timestamp)
+    return response
+
+
+# ETag/Last-Modified for list views, derived from the queryset watermark
+class WatermarkConditionalMixin:
+    def conditional_list(self, queryset, build_response):
+        """
+        Answer 304 from the watermark alone when the client's copy is
+        current, otherwise call ``build_response`` and tag its response.
+        """
+        etag, timestamp, response = evaluate_watermark(
+            self.request, self.request.user, get_watermark(queryset)
+        )
+        if response is None:
+            response = build_response()
+        return tag_response(response, etag, timestamp)
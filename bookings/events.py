@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Queued events per connection before a slow client starts losing them; it
+# can always catch up through the /api/calendar/changes/ feed
+MAX_PENDING_EVENTS = 100
+
+
+class InProcessBroker:
+    """
+    Fan out calendar events to the streaming connections of this process.
+    publish() may be called from any thread, subscribers are async.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop is already closed
+                pass
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def subscribe(self, heartbeat=None):
+        """
+        Yield published events, and None every ``heartbeat`` seconds without
+        one so the caller can keep the connection alive.
+        """
+        queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+_broker = None
+
+
+def get_broker():
+    # settings.CALENDAR_EVENTS_BROKER swaps in another broker implementation
+    global _broker
+    if _broker is None:
+        _broker = import_string(
+            getattr(
+                settings, "CALENDAR_EVENTS_BROKER", "bookings.events.InProcessBroker"
+            )
+        )()
+    return _broker
+
+
+def publish(event):
+    get_broker().publish(event)
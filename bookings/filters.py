@@ -0,0 +1,35 @@
+from django.utils.dateparse import parse_date
+from rest_framework import filters, serializers
+
+from .slots import day_bounds
+
+
+def parse_window_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise serializers.ValidationError({name: "Use the format YYYY-MM-DD."})
+    return parsed
+
+
+def filter_date_window(queryset, params):
+    # Keep the bookings overlapping ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    date_from = parse_window_date(params, "date_from")
+    date_to = parse_window_date(params, "date_to")
+
+    if date_from is not None:
+        queryset = queryset.filter(end_time__gt=day_bounds(date_from, date_from)[0])
+    if date_to is not None:
+        queryset = queryset.filter(date_time__lt=day_bounds(date_to, date_to)[1])
+    return queryset
+
+
+# Restrict bookings to the ones overlapping ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+class BookingDateWindowFilter(filters.BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        return filter_date_window(queryset, request.query_params)
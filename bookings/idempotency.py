@@ -0,0 +1,48 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.utils import timezone
+
+from backend.renderers import dumps
+
+from .models import IdempotencyKey
+
+# Keys are honoured this long, older ones are pruned and can be reused
+RETENTION = timedelta(hours=24)
+
+
+def fingerprint(data):
+    # Hash of the parsed request body, whatever its key order or encoding
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def claim(user, key, request_hash):
+    """
+    Return (record, created) for the user's key. A record older than
+    RETENTION is dropped and claimed again, like a key never seen before.
+    """
+    record, created = IdempotencyKey.objects.get_or_create(
+        user=user, key=key[:255], defaults={"request_hash": request_hash}
+    )
+    if not created and record.created_at < timezone.now() - RETENTION:
+        record.delete()
+        return claim(user, key, request_hash)
+    return record, created
+
+
+def store(record, response):
+    # Keep the body exactly as the client received it: datetimes and
+    # decimals are stored as the strings the JSON renderer wrote
+    record.status_code = response.status_code
+    record.response = json.loads(dumps(response.data))
+    record.save(update_fields=["status_code", "response"])
+
+
+def prune(older_than=RETENTION):
+    cutoff = timezone.now() - older_than
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
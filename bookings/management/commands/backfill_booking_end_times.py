@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored total_worktime and end_time of bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of bookings updated per query.",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only backfill bookings that have no stored end_time yet.",
+        )
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.order_by("id")
+        if options["missing_only"]:
+            bookings = bookings.filter(end_time__isnull=True)
+
+        updated = bookings.refresh_schedule(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} bookings."))
@@ -0,0 +1,95 @@
+import json
+import math
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import benchmark
+
+DEFAULT_BUDGETS = settings.BASE_DIR / "benchmarks" / "budgets.json"
+# --write allows this much p95 slack over the measured value, rounded up to
+# LATENCY_STEP ms and never below MIN_LATENCY ms, timings are noisy
+LATENCY_HEADROOM = 2
+LATENCY_STEP = 5
+MIN_LATENCY = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the endpoints on seeded data and fail when one of them "
+        "exceeds its query count or p95 latency budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budgets",
+            default=str(DEFAULT_BUDGETS),
+            help="Budget file (default: benchmarks/budgets.json).",
+        )
+        parser.add_argument("--iterations", type=int)
+        parser.add_argument(
+            "--queries-only",
+            action="store_true",
+            help="Ignore the latency budgets, e.g. on a slower machine.",
+        )
+        parser.add_argument(
+            "--write",
+            action="store_true",
+            help="Measure every scenario and rewrite the budget file from it.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["budgets"]) as budget_file:
+                config = json.load(budget_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {options['budgets']}: {exc}")
+
+        budgets = config["budgets"]
+        iterations = options["iterations"] or config.get("iterations", 20)
+        only = None if options["write"] else set(budgets)
+        with benchmark.seeded_database(**config["dataset"]):
+            results = benchmark.run(iterations, config.get("warmup", 2), only)
+
+        if options["write"]:
+            config["budgets"] = {
+                result["name"]: {
+                    "queries": result["queries_max"],
+                    "p95_ms": latency_budget(result["p95_ms"]),
+                }
+                for result in results
+            }
+            with open(options["budgets"], "w") as budget_file:
+                json.dump(config, budget_file, indent=2)
+                budget_file.write("\n")
+            self.stdout.write(f"Wrote {len(results)} budgets to {options['budgets']}.")
+            return
+
+        missing = set(budgets) - {result["name"] for result in results}
+        if missing:
+            raise CommandError(f"No scenario for budgets: {', '.join(sorted(missing))}")
+
+        failures = 0
+        for result in results:
+            problems = benchmark.over_budget(
+                result, budgets[result["name"]], latency=not options["queries_only"]
+            )
+            if problems:
+                failures += 1
+                self.stdout.write(
+                    self.style.ERROR(f"FAIL {result['name']}: {', '.join(problems)}")
+                )
+            else:
+                self.stdout.write(
+                    f"ok   {result['name']}: {result['queries_max']} queries, "
+                    f"p95 {result['p95_ms']} ms"
+                )
+
+        if failures:
+            raise CommandError(f"{failures} of {len(results)} endpoints over budget.")
+        self.stdout.write(self.style.SUCCESS(f"All {len(results)} within budget."))
+
+
+def latency_budget(p95_ms):
+    budget = math.ceil(p95_ms * LATENCY_HEADROOM / LATENCY_STEP) * LATENCY_STEP
+    return max(budget, MIN_LATENCY)
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from bookings import transfer
+from bookings.filters import filter_date_window
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Stream bookings to a .csv or .jsonl file (or stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", nargs="?", help="Target file (default: stdout).")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Output format (default: taken from the file name, else csv).",
+        )
+        parser.add_argument(
+            "--date-from", help="Only bookings ending after YYYY-MM-DD."
+        )
+        parser.add_argument("--date-to", help="Only bookings starting by YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        fmt = options["format"] or (output and transfer.detect_format(output)) or "csv"
+
+        try:
+            bookings = filter_date_window(
+                Booking.objects.order_by("id"),
+                {"date_from": options["date_from"], "date_to": options["date_to"]},
+            )
+        except serializers.ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        target = (
+            open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+        )
+        try:
+            for chunk in transfer.stream(transfer.export_rows(bookings), fmt):
+                target.write(chunk)
+        finally:
+            if output:
+                target.close()
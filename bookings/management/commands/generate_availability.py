@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from bookings.models import RecurringSchedule
+from bookings.schedules import generate_availability
+
+
+class Command(BaseCommand):
+    help = "Expand recurring weekly schedules into Availability rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "schedule_ids",
+            nargs="*",
+            type=int,
+            help="Schedules to expand (default: all).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        schedules = RecurringSchedule.objects.order_by("id")
+        if options["schedule_ids"]:
+            schedules = schedules.filter(id__in=options["schedule_ids"])
+
+        for schedule in schedules:
+            created, skipped = generate_availability(
+                schedule, batch_size=options["batch_size"]
+            )
+            self.stdout.write(
+                f"{schedule}: created {created}, skipped {len(skipped)} "
+                "dates that already had overlapping availability."
+            )
+        self.stdout.write(self.style.SUCCESS("Done."))
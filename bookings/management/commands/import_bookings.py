@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings import transfer
+
+
+class Command(BaseCommand):
+    help = "Import bookings from a .csv or .jsonl file in validated batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File exported by export_bookings.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format (default: taken from the file name).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=transfer.CHUNK_SIZE,
+            help="Rows validated and inserted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or transfer.detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Pass --format, the file name has no known extension.")
+
+        with open(options["path"], "rb") as source:
+            report = transfer.import_bookings(
+                source, fmt, batch_size=options["batch_size"]
+            )
+
+        for error in report["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report['created']} bookings, rejected {report['failed']}."
+            )
+        )
@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from backend import perf
+
+
+class Command(BaseCommand):
+    help = "Print the per-route request histograms collected by PerformanceMiddleware."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json", action="store_true", help="Print the merged histograms as JSON."
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["total", "count", "p95", "queries"],
+            default="total",
+            help="Order of the routes (default: time spent in total).",
+        )
+
+    def handle(self, *args, **options):
+        routes = perf.read_all()
+        rows = [summarize(route, data) for route, data in routes.items()]
+        rows.sort(key=lambda row: row[options["sort"]] or float("inf"), reverse=True)
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps({"buckets_ms": perf.BUCKETS, "routes": rows}, indent=2)
+            )
+            return
+        if not rows:
+            self.stdout.write("No requests recorded yet.")
+            return
+
+        self.stdout.write(
+            f"{'route':<48} {'count':>7} {'avg':>8} {'p50':>6} {'p95':>6} "
+            f"{'p99':>6} {'max':>8} {'queries':>8} {'db':>8} {'serialize':>9} "
+            f"{'render':>8}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['route'][:48]:<48} {row['count']:>7} {row['avg_ms']:>8} "
+                f"{bound(row['p50']):>6} {bound(row['p95']):>6} {bound(row['p99']):>6} "
+                f"{row['max_ms']:>8} {row['queries']:>8} {row['db_ms']:>8} "
+                f"{row['serialize_ms']:>9} {row['render_ms']:>8}"
+            )
+        self.stdout.write("Times in ms; percentiles are histogram bucket bounds.")
+
+
+def summarize(route, data):
+    count = data["count"] or 1
+    return {
+        "route": route,
+        "count": data["count"],
+        "total": round(data["total_ms"]),
+        "avg_ms": round(data["total_ms"] / count, 1),
+        "p50": perf.percentile(data, 0.50),
+        "p95": perf.percentile(data, 0.95),
+        "p99": perf.percentile(data, 0.99),
+        "max_ms": round(data["max_ms"], 1),
+        # Per request averages
+        "queries": round(data["queries"] / count, 1),
+        "db_ms": round(data["db_ms"] / count, 1),
+        "serialize_ms": round(data["serialize_ms"] / count, 1),
+        "render_ms": round(data["render_ms"] / count, 1),
+    }
+
+
+def bound(value):
+    return f">{perf.BUCKETS[-1]}" if value is None else value
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from bookings.changes import RETENTION, prune
+
+
+class Command(BaseCommand):
+    help = "Delete calendar change-log entries older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=RETENTION.days,
+            help="Keep entries from the last N days (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        # Sync tokens live as long as RETENTION, never prune inside it
+        days = max(options["days"], RETENTION.days)
+        deleted = prune(timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} calendar changes."))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from bookings.idempotency import RETENTION, prune
+
+RETENTION_HOURS = RETENTION // timedelta(hours=1)
+
+
+class Command(BaseCommand):
+    help = "Delete booking Idempotency-Key records older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=RETENTION_HOURS,
+            help="Keep keys from the last N hours (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        # Keys are honoured for RETENTION, never prune inside it
+        hours = max(options["hours"], RETENTION_HOURS)
+        deleted = prune(timedelta(hours=hours))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idempotency keys."))
@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, services, availability and bookings from a fixed random "
+        "seed, for the endpoint benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--services", type=int, default=12)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--bookings", type=int, default=1500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            help="First seeded day, YYYY-MM-DD (default: tomorrow).",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 2 or options["services"] < 1 or options["users"] < 1:
+            raise CommandError("Seed at least 2 days, 1 service and 1 user.")
+        if seeding.is_seeded():
+            raise CommandError(
+                f"{seeding.ADMIN_EMAIL} already exists, seed an empty database."
+            )
+
+        try:
+            with transaction.atomic():
+                summary = seeding.seed(
+                    users=options["users"],
+                    services=options["services"],
+                    days=options["days"],
+                    bookings=options["bookings"],
+                    seed=options["seed"],
+                    start=options["start"],
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["verbosity"] == 0:
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {summary['users']} users, {summary['services']} services, "
+                f"{summary['availability']} availability days and "
+                f"{summary['bookings']} bookings from {summary['start']} "
+                f"(seed {summary['seed']}). Log in as {summary['admin']} with "
+                f"password {seeding.PASSWORD!r}."
+            )
+        )
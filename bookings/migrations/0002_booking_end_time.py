@@ -0,0 +1,24 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:39
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="end_time",
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="booking",
+            name="total_worktime",
+            field=models.DurationField(default=datetime.timedelta, editable=False),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:40
+
+from datetime import timedelta
+
+from django.core.management.base import CommandError
+from django.db import migrations, models
+
+# Overlapping pairs spelled out in the error, the rest are only counted
+MAX_LISTED_OVERLAPS = 20
+
+
+def backfill_end_times(apps, schema_editor):
+    # The exclusion constraint needs every row to carry its real end_time
+    Booking = apps.get_model("bookings", "Booking")
+    for booking in Booking.objects.filter(end_time__isnull=True).prefetch_related(
+        "services"
+    ):
+        booking.total_worktime = sum(
+            [service.worktime for service in booking.services.all()], timedelta()
+        )
+        booking.end_time = booking.date_time + booking.total_worktime
+        booking.save(update_fields=["total_worktime", "end_time"])
+
+
+def overlapping_bookings(Booking):
+    # (id, id) pairs of bookings whose intervals intersect, found in one pass
+    # over the rows in start order against the latest end seen so far
+    pairs = []
+    latest_id, latest_end = None, None
+    rows = (
+        Booking.objects.filter(end_time__isnull=False)
+        .order_by("date_time", "id")
+        .values_list("id", "date_time", "end_time")
+    )
+    for booking_id, start, end in rows.iterator():
+        if latest_end is not None and start < latest_end:
+            pairs.append((latest_id, booking_id))
+        if latest_end is None or end > latest_end:
+            latest_id, latest_end = booking_id, end
+    return pairs
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Postgres would only report the first conflicting row it hits
+    pairs = overlapping_bookings(apps.get_model("bookings", "Booking"))
+    if pairs:
+        listed = ", ".join(
+            f"{first} and {second}" for first, second in pairs[:MAX_LISTED_OVERLAPS]
+        )
+        more = len(pairs) - MAX_LISTED_OVERLAPS
+        raise CommandError(
+            f"{len(pairs)} pairs of bookings overlap, the booking_no_overlap "
+            f"constraint cannot be added. Overlapping booking ids: {listed}"
+            + (f" and {more} more pairs" if more > 0 else "")
+            + ". Move or delete one booking of each pair, then run migrate again."
+        )
+    schema_editor.execute(
+        "ALTER TABLE bookings_booking ADD CONSTRAINT booking_no_overlap "
+        "EXCLUDE USING gist (tstzrange(date_time, end_time, '[)') WITH &&) "
+        "WHERE (end_time IS NOT NULL)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0002_booking_end_time"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["date_time", "end_time"], name="booking_interval_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_end_times, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0004_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="availability",
+            index=models.Index(
+                condition=models.Q(("is_available", True)),
+                fields=["date", "start_time", "end_time"],
+                name="availability_open_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="availability",
+            index=models.Index(
+                fields=["date", "start_time"], name="availability_day_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "date_time"], name="booking_user_start_idx"
+            ),
+        ),
+    ]
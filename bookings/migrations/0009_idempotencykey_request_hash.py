@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0008_recurringschedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="request_hash",
+            field=models.CharField(default="", max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="idempotencykey",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.15 on 2026-10-18 13:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0009_idempotencykey_request_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="calendarchange",
+            index=models.Index(
+                fields=["model", "action", "created_at"],
+                name="calendarchange_action_idx",
+            ),
+        ),
+    ]
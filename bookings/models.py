@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Prefetch, Q, Sum
 from django.conf import settings  # To access AUTH_USER_MODEL
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.utils.timezone import timedelta
 
@@ -24,26 +26,109 @@ class Service(models.Model):
         blank=True,
         related_name="services",
     )
+    # Booking lists embed the name and worktime, see bookings.conditional
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         info = f" - {self.information}" if self.information else ""
         return f"{self.name} ({self.worktime}, {self.price} EUR){info}"
 
 
+# PostgreSQL exclusion constraint over the booking intervals, see migration 0003
+OVERLAP_CONSTRAINT = "booking_no_overlap"
+
+
+def is_overlap_error(error):
+    # psycopg names the violated constraint, SQLite has no such constraint
+    diag = getattr(error.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) == OVERLAP_CONSTRAINT
+
+
+class BookingQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        # Bookings whose [date_time, end_time) interval intersects [start, end)
+        return self.filter(date_time__lt=end, end_time__gt=start)
+
+    def with_details(self):
+        # Load the user with a join and the services in one extra query,
+        # limited to the columns ServiceSerializer reads
+        return self.select_related("user").prefetch_related(
+            Prefetch(
+                "services",
+                queryset=Service.objects.only(
+                    "id", "name", "worktime", "price", "information"
+                ),
+            )
+        )
+
+    def refresh_schedule(self, batch_size=500):
+        # Recompute the stored total_worktime and end_time from the services
+        bookings = self.annotate(services_worktime=Sum("services__worktime")).only(
+            "id", "date_time", "total_worktime", "end_time", "updated_at"
+        )
+        fields = ["total_worktime", "end_time", "updated_at"]
+        now = timezone.now()
+        pending = []
+        updated = 0
+        for booking in bookings.iterator(chunk_size=batch_size):
+            booking.total_worktime = booking.services_worktime or timedelta()
+            booking.end_time = booking.date_time + booking.total_worktime
+            # bulk_update() does not apply auto_now
+            booking.updated_at = now
+            pending.append(booking)
+            if len(pending) >= batch_size:
+                self.model.objects.bulk_update(pending, fields)
+                updated += len(pending)
+                pending = []
+        if pending:
+            self.model.objects.bulk_update(pending, fields)
+            updated += len(pending)
+        return updated
+
+
 class Booking(models.Model):
     services = models.ManyToManyField(Service)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date_time = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     notes = models.TextField(null=True, blank=True)
+    # Denormalized from services, kept up to date by bookings.signals
+    total_worktime = models.DurationField(default=timedelta, editable=False)
+    end_time = models.DateTimeField(null=True, editable=False, db_index=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        # On PostgreSQL migration 0003 also adds the booking_no_overlap GiST
+        # exclusion constraint over tstzrange(date_time, end_time)
+        indexes = [
+            models.Index(fields=["date_time", "end_time"], name="booking_interval_idx"),
+            # BookingListView: filter on user, ordered by start time
+            models.Index(fields=["user", "date_time"], name="booking_user_start_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.date_time}"
 
+    def save(self, *args, **kwargs):
+        # Keep the stored end time in step with the start time
+        self.end_time = self.date_time + self.total_worktime
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = {*update_fields, "updated_at"}
+            if "date_time" in update_fields:
+                update_fields.add("end_time")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
     def is_cancellable(self):
         return self.date_time - timezone.now() >= timezone.timedelta(hours=8)
 
     def calculate_end_time(self):
+        # Use the stored end time, rows that are not backfilled yet fall through
+        if self.end_time is not None:
+            return self.end_time
         # Calculate total duration of services
         total_worktime = sum(
             [service.worktime for service in self.services.all()], timedelta()
@@ -57,6 +142,98 @@ class Availability(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     is_available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Slot lookups only ever look at open windows of one day
+            models.Index(
+                fields=["date", "start_time", "end_time"],
+                condition=Q(is_available=True),
+                name="availability_open_idx",
+            ),
+            # Admin overlap check and date filters, open or not
+            models.Index(fields=["date", "start_time"], name="availability_day_idx"),
+        ]
 
     def __str__(self):
         return f"Available on {self.date} from {self.start_time} to {self.end_time}"
+
+
+# Stored outcome of a booking request sent with an Idempotency-Key header
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # SHA-256 of the request body, a retry must send the same body
+    request_hash = models.CharField(max_length=64, default="")
+    # Both stay empty while the first request is still being processed
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # Pruned after bookings.idempotency.RETENTION
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_user_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+# Append-only log of booking and availability writes, read by the
+# /api/calendar/changes/ delta sync feed
+class CalendarChange(models.Model):
+    BOOKING = "booking"
+    AVAILABILITY = "availability"
+    MODEL_CHOICES = [(BOOKING, "Booking"), (AVAILABILITY, "Availability")]
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTION_CHOICES = [(CREATED, "Created"), (UPDATED, "Updated"), (DELETED, "Deleted")]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Latest deletion per model, part of the list Last-Modified
+            models.Index(
+                fields=["model", "action", "created_at"],
+                name="calendarchange_action_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action}"
+
+
+# Weekly opening hours, expanded into Availability rows by bookings.schedules
+class RecurringSchedule(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # ISO dates (e.g. holidays) that are skipped during expansion
+    exceptions = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return (
+            f"{self.get_weekday_display()} {self.start_time}-{self.end_time} "
+            f"({self.start_date} to {self.end_date})"
+        )
@@ -0,0 +1,30 @@
+from rest_framework.renderers import BaseRenderer
+
+from backend.renderers import FastJSONRenderer
+
+
+# Negotiation-only renderers for the streamed booking export. The view
+# returns a StreamingHttpResponse, so render() only ever sees error payloads
+# and those are switched back to JSON by the view
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class JSONLinesRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "jsonl"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+# ?format=columnar: same JSON encoding, the compact list views switch to
+# one array per column when this renderer is picked
+class ColumnarJSONRenderer(FastJSONRenderer):
+    format = "columnar"
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from . import changes
+from .models import Availability, CalendarChange
+
+
+def schedule_dates(schedule):
+    # Every date in the span that falls on the weekday and is not an exception
+    exceptions = {date.fromisoformat(str(value)) for value in schedule.exceptions}
+    first = schedule.start_date + timedelta(
+        days=(schedule.weekday - schedule.start_date.weekday()) % 7
+    )
+    current = first
+    while current <= schedule.end_date:
+        if current not in exceptions:
+            yield current
+        current += timedelta(weeks=1)
+
+
+def generate_availability(schedule, batch_size=500):
+    """
+    Expand ``schedule`` into Availability rows. Dates that already have an
+    overlapping window are found with one set-based query and skipped, the
+    rest are written with bulk_create. Returns (created, skipped_dates).
+    """
+    dates = list(schedule_dates(schedule))
+    if not dates:
+        return 0, []
+
+    with transaction.atomic():
+        taken = set(
+            Availability.objects.filter(
+                date__gte=dates[0],
+                date__lte=dates[-1],
+                start_time__lt=schedule.end_time,
+                end_time__gt=schedule.start_time,
+            ).values_list("date", flat=True)
+        )
+        created = Availability.objects.bulk_create(
+            [
+                Availability(
+                    date=day,
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time,
+                )
+                for day in dates
+                if day not in taken
+            ],
+            batch_size=batch_size,
+        )
+        # bulk_create() sends no post_save, log the rows for the sync feeds
+        created_ids = [availability.pk for availability in created if availability.pk]
+        if created_ids:
+            changes.log(
+                CalendarChange.AVAILABILITY, created_ids, CalendarChange.CREATED
+            )
+
+    return len(created), sorted(day for day in dates if day in taken)
@@ -0,0 +1,172 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from . import changes
+from .models import (
+    Availability,
+    Booking,
+    CalendarChange,
+    Category,
+    RecurringSchedule,
+    Service,
+)
+
+EMAIL_DOMAIN = "bench.example.com"
+ADMIN_EMAIL = f"admin@{EMAIL_DOMAIN}"
+PASSWORD = "benchmark-password"
+
+# Daily opening hours of the seeded availability windows
+OPENS = time(8)
+CLOSES = time(18)
+# Bookings are written this many rows at a time
+BATCH_SIZE = 5000
+
+
+def user_email(index):
+    return f"user{index}@{EMAIL_DOMAIN}"
+
+
+def is_seeded():
+    return get_user_model().objects.filter(email=ADMIN_EMAIL).exists()
+
+
+def seed(users=200, services=12, days=365, bookings=1500, seed=0, start=None):
+    """
+    Fill the database with a synthetic salon: ``users`` customers and one
+    admin, ``services`` services in three categories, an availability window
+    every day for ``days`` days from ``start`` (tomorrow by default) and
+    ``bookings`` back-to-back bookings with random services and gaps.
+
+    Everything random comes from random.Random(seed), so the same arguments
+    give the same rows, only shifted to the start date. The last day is
+    left without bookings for the write endpoints of the benchmarks. Raises
+    ValueError when the bookings do not fit in the other days.
+    """
+    rng = random.Random(seed)
+    start = start or timezone.localdate() + timedelta(days=1)
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+
+    # Hashing once keeps seeding fast, every user shares the password
+    password = make_password(PASSWORD)
+    User = get_user_model()
+    admin = User.objects.create(
+        email=ADMIN_EMAIL,
+        password=password,
+        name="Bench",
+        surname="Admin",
+        is_staff=True,
+        is_superuser=True,
+    )
+    customers = User.objects.bulk_create(
+        [
+            User(
+                email=user_email(index),
+                password=password,
+                name="Bench",
+                surname=f"User {index}",
+                phone_number=f"+46700{index:06d}",
+            )
+            for index in range(users)
+        ]
+    )
+
+    categories = Category.objects.bulk_create(
+        [Category(name=f"Bench category {index}") for index in range(3)]
+    )
+    catalogue = Service.objects.bulk_create(
+        [
+            Service(
+                name=f"Bench service {index}",
+                worktime=timedelta(minutes=15 * rng.randint(1, 4)),
+                price=rng.randint(20, 120),
+                information=f"Seeded service {index}",
+                category=categories[index % len(categories)],
+            )
+            for index in range(services)
+        ]
+    )
+
+    windows = Availability.objects.bulk_create(
+        [Availability(date=date, start_time=OPENS, end_time=CLOSES) for date in dates]
+    )
+    changes.log(
+        CalendarChange.AVAILABILITY,
+        [window.id for window in windows],
+        CalendarChange.CREATED,
+    )
+    RecurringSchedule.objects.create(
+        weekday=start.weekday(),
+        start_time=OPENS,
+        end_time=CLOSES,
+        start_date=start,
+        end_date=dates[-1],
+    )
+
+    booking_ids = seed_bookings(rng, bookings, dates[:-1], customers, catalogue)
+    changes.log(CalendarChange.BOOKING, booking_ids, CalendarChange.CREATED)
+    return {
+        "users": len(customers),
+        "admin": admin.email,
+        "services": len(catalogue),
+        "availability": len(windows),
+        "bookings": len(booking_ids),
+        "start": start.isoformat(),
+        "seed": seed,
+    }
+
+
+def seed_bookings(rng, count, dates, customers, catalogue):
+    # Walk through the days filling each window with random bookings
+    booking_ids = []
+    pending = []
+    days = iter(dates)
+    cursor = closes = None
+    for _ in range(count):
+        picked = rng.sample(catalogue, rng.randint(1, min(3, len(catalogue))))
+        worktime = sum((service.worktime for service in picked), timedelta())
+        gap = timedelta(minutes=15 * rng.randint(0, 4))
+        if cursor is None or cursor + gap + worktime > closes:
+            date = next(days, None)
+            if date is None:
+                raise ValueError(f"{count} bookings do not fit in {len(dates)} days.")
+            cursor = make_aware(datetime.combine(date, OPENS))
+            closes = make_aware(datetime.combine(date, CLOSES))
+            gap = timedelta()
+        date_time = cursor + gap
+        cursor = date_time + worktime
+        pending.append(
+            (
+                picked,
+                Booking(
+                    user=rng.choice(customers),
+                    date_time=date_time,
+                    end_time=cursor,
+                    total_worktime=worktime,
+                    notes="",
+                ),
+            )
+        )
+        if len(pending) == BATCH_SIZE:
+            booking_ids.extend(write_bookings(pending))
+            pending = []
+    booking_ids.extend(write_bookings(pending))
+    return booking_ids
+
+
+def write_bookings(pending):
+    # bulk_create() skips the m2m signals, the stored end times are set above
+    through = Booking.services.through
+    created = Booking.objects.bulk_create([booking for _, booking in pending])
+    through.objects.bulk_create(
+        [
+            through(booking_id=booking.id, service_id=service.id)
+            for (picked, _), booking in zip(pending, created)
+            for service in picked
+        ]
+    )
+    return [booking.id for booking in created]
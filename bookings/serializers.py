@@ -1,20 +1,137 @@
 from rest_framework import serializers
-from .models import Booking, Service, Availability, Category
+from .models import (
+    Booking,
+    Service,
+    Availability,
+    Category,
+    RecurringSchedule,
+    is_overlap_error,
+)
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
 from django.utils.timezone import localtime
 from datetime import timedelta
+from collections import namedtuple
+from contextlib import contextmanager
 from accounts.models import CustomUser
+from backend.serializers import TimedSerializerMixin
+
+
+def total_worktime(services):
+    return sum([service.worktime for service in services], timedelta())
+
+
+# Outcome of resolve_slot, reused by the create/update path
+SlotResolution = namedtuple(
+    "SlotResolution", ["start_time", "end_time", "total_worktime", "availability"]
+)
+
+
+# Find the availability window for a booking and make sure it is still free.
+# Runs exactly one availability query and one overlap query; with lock=True
+# the window row is locked so concurrent bookers of it queue up
+def resolve_slot(start_time, services, instance=None, lock=False):
+    worktime = total_worktime(services)
+    end_time = start_time + worktime
+
+    # Convert start_time and end_time to naive local time for checking availability
+    local_start_time = localtime(start_time).replace(tzinfo=None)
+    local_end_time = localtime(end_time).replace(tzinfo=None)
+
+    availabilities = Availability.objects.filter(
+        date=local_start_time.date(),
+        start_time__lte=local_start_time.time(),
+        end_time__gte=local_end_time.time(),
+        is_available=True,
+    ).order_by("start_time")
+    if lock:
+        availabilities = availabilities.select_for_update()
+
+    # Check availability for the desired time slot
+    availability = availabilities.first()
+    if availability is None:
+        raise serializers.ValidationError("The selected time slot is unavailable.")
+
+    # Check for overlapping bookings, excluding the current one if updating
+    overlapping_bookings = Booking.objects.overlapping(start_time, end_time)
+    if instance is not None:
+        overlapping_bookings = overlapping_bookings.exclude(id=instance.id)
+
+    if overlapping_bookings.exists():
+        raise serializers.ValidationError(
+            "The booking time overlaps with an existing booking."
+        )
+
+    return SlotResolution(start_time, end_time, worktime, availability)
+
+
+# SQLite has no row locks. A write as the first statement of the transaction
+# takes the database write lock up front (like BEGIN IMMEDIATE), so concurrent
+# bookers wait for each other instead of failing to upgrade their read lock
+def lock_bookings():
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Booking._meta.db_table} SET id = id WHERE 0")
+
+
+# Write the booking and its services atomically. On PostgreSQL the
+# booking_no_overlap constraint rejects a slot that was taken concurrently
+@contextmanager
+def overlap_guard(message="The booking time overlaps with an existing booking."):
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if not is_overlap_error(exc):
+            raise
+        raise serializers.ValidationError(message)
+
+
+# Link the services a booking's total_worktime was computed from. The stored
+# schedule is already right, so bookings.signals skips its recompute
+def set_services(booking, services, created=False):
+    booking._schedule_current = True
+    try:
+        if created:
+            # A new booking has no links to diff against
+            booking.services.add(*services)
+        else:
+            booking.services.set(services)
+    finally:
+        del booking._schedule_current
+
+
+# Plain dict rows for the hand-built booking list endpoints
+def booking_services_data(services):
+    return [
+        {"name": service.name, "worktime": service.worktime} for service in services
+    ]
+
+
+def anonymized_booking_data(booking, services):
+    return {
+        "date_time": booking.date_time.isoformat(),
+        "end_time": booking.calculate_end_time().isoformat(),
+        "services": booking_services_data(services),
+    }
+
+
+def user_booking_data(booking, services):
+    data = anonymized_booking_data(booking, services)
+    data["id"] = booking.id
+    data["created_at"] = booking.created_at
+    return data
 
 
 # Serializer for Service with added price and worktime fields
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = ["id", "name", "worktime", "price", "information"]
 
 
 # Serializer for Booking to handle multiple services and support update
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     services = ServiceSerializer(many=True, read_only=True)  # Return list of services
     service_ids = serializers.PrimaryKeyRelatedField(
         queryset=Service.objects.all(), source="services", many=True, write_only=True
@@ -29,91 +146,129 @@ class BookingSerializer(serializers.ModelSerializer):
     def validate(self, data):
         services = data.get("services", [])
         start_time = data.get("date_time")
-        total_duration = sum(
-            [service.worktime for service in services], timedelta()
-        )  # Summing worktimes
 
         # Prevent booking in the past
         if start_time and start_time < timezone.now():
             raise serializers.ValidationError("Cannot book in the past.")
 
-        end_time = start_time + total_duration
-
-        # Convert start_time and end_time to naive local time for checking availability
-        local_start_time = localtime(start_time).replace(tzinfo=None)
-        local_end_time = localtime(end_time).replace(tzinfo=None)
-
-        # Check availability for the desired time slot
-        if not Availability.objects.filter(
-            date=local_start_time.date(),
-            start_time__lte=local_start_time.time(),
-            end_time__gte=local_end_time.time(),
-            is_available=True,
-        ).exists():
-            raise serializers.ValidationError("The selected time slot is unavailable.")
-
-        # Check for overlapping bookings, excluding the current one if updating
-        overlapping_bookings = Booking.objects.filter(
-            date_time__lt=end_time, date_time__gte=start_time
+        # Resolved once here and reused by create/update and the views
+        self.slot = resolve_slot(
+            start_time,
+            services,
+            instance=self.instance,
+            lock=self.context.get("lock_slot", False),
         )
 
-        if self.instance:
-            overlapping_bookings = overlapping_bookings.exclude(
-                id=self.instance.id
-            )  # Exclude current booking
-
-        if overlapping_bookings.exists():
-            raise serializers.ValidationError(
-                "The booking time overlaps with an existing booking."
-            )
-
         return data
 
     # Create booking
     def create(self, validated_data):
         services = validated_data.pop("services", [])
-        booking = Booking.objects.create(**validated_data)  # Creating the booking
-        booking.services.set(services)  # Setting the services for the booking
+        with overlap_guard():
+            booking = Booking.objects.create(
+                total_worktime=self.slot.total_worktime, **validated_data
+            )  # Creating the booking
+            set_services(booking, services, created=True)
         return booking
 
     # Edit booking
     def update(self, instance, validated_data):
         services = validated_data.pop("services", None)
-        instance = super().update(instance, validated_data)
-        if services is not None:
-            instance.services.set(services)  # Update services
+        with overlap_guard():
+            if services is not None:
+                instance.total_worktime = self.slot.total_worktime
+            instance = super().update(instance, validated_data)
+            if services is not None:
+                set_services(instance, services)
         return instance
 
 
 # Serializer for Availability
-class AvailabilitySerializer(serializers.ModelSerializer):
+class AvailabilitySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Availability
         fields = ["id", "date", "start_time", "end_time", "is_available"]
 
 
+# Query parameters for the free-slot lookup
+class FreeSlotsQuerySerializer(serializers.Serializer):
+    MAX_RANGE = timedelta(days=62)
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    service_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+    def validate(self, data):
+        if data["date_to"] < data["date_from"]:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        if data["date_to"] - data["date_from"] > self.MAX_RANGE:
+            raise serializers.ValidationError(
+                f"The requested range cannot exceed {self.MAX_RANGE.days} days."
+            )
+
+        services = list(Service.objects.filter(id__in=data["service_ids"]))
+        if len(services) != len(set(data["service_ids"])):
+            raise serializers.ValidationError(
+                {"service_ids": "One or more services do not exist."}
+            )
+        data["services"] = services
+        return data
+
+
 #  ----------------------- ADMIN SERIALIZERS ----------
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name"]
 
 
-class AdminServiceSerializer(serializers.ModelSerializer):
+class AdminServiceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = ["id", "name", "worktime", "price", "information", "category"]
 
 
-class AdminAvailabilitySerializer(serializers.ModelSerializer):
+class AdminAvailabilitySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Availability
         fields = ["id", "date", "start_time", "end_time", "is_available"]
 
 
-class AdminBookingSerializer(serializers.ModelSerializer):
+class RecurringScheduleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    exceptions = serializers.ListField(
+        child=serializers.DateField(), required=False, default=list
+    )
+
+    class Meta:
+        model = RecurringSchedule
+        fields = [
+            "id",
+            "weekday",
+            "start_time",
+            "end_time",
+            "start_date",
+            "end_date",
+            "exceptions",
+        ]
+
+    def validate(self, data):
+        start_time = data.get("start_time", getattr(self.instance, "start_time", None))
+        end_time = data.get("end_time", getattr(self.instance, "end_time", None))
+        start_date = data.get("start_date", getattr(self.instance, "start_date", None))
+        end_date = data.get("end_date", getattr(self.instance, "end_date", None))
+
+        if start_time >= end_time:
+            raise serializers.ValidationError("end_time must be after start_time.")
+        if start_date > end_date:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return data
+
+
+class AdminBookingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     services = ServiceSerializer(many=True, read_only=True)
     service_ids = serializers.PrimaryKeyRelatedField(
         queryset=Service.objects.all(), source="services", many=True, write_only=True
@@ -154,68 +309,36 @@ class AdminBookingSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         services = validated_data.pop("services", [])
-        booking = Booking.objects.create(**validated_data)
-        booking.services.set(services)
+        with overlap_guard():
+            booking = Booking.objects.create(
+                total_worktime=self.slot.total_worktime, **validated_data
+            )
+            set_services(booking, services, created=True)
         return booking
 
     def update(self, instance, validated_data):
         services = validated_data.pop("services", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        if services is not None:
-            instance.services.set(services)
-        instance.save()
+        with overlap_guard():
+            if services is not None:
+                instance.total_worktime = self.slot.total_worktime
+            instance.save()
+            if services is not None:
+                set_services(instance, services)
         return instance
 
     def get_end_time(self, obj):
-        total_duration = timedelta()
-        for service in obj.services.all():
-            if isinstance(service.worktime, timedelta):
-                total_duration += service.worktime
-            else:
-                try:
-                    h, m, s = map(int, service.worktime.split(":"))
-                    total_duration += timedelta(hours=h, minutes=m, seconds=s)
-                except (ValueError, AttributeError):
-                    # If parsing fails, skip this service or handle the error
-                    continue
-        end_time = obj.date_time + total_duration
-        return end_time.isoformat()
+        return obj.calculate_end_time().isoformat()
 
     def validate(self, data):
         services = data.get("services", [])
         start_time = data.get("date_time")
-        total_duration = sum([service.worktime for service in services], timedelta())
 
         # Prevent booking in the past
         if start_time < timezone.now():
             raise serializers.ValidationError("Cannot book in the past.")
 
-        end_time = start_time + total_duration
-
-        # Convert start_time and end_time to naive local time for checking availability
-        local_start_time = localtime(start_time).replace(tzinfo=None)
-        local_end_time = localtime(end_time).replace(tzinfo=None)
-
-        # Check availability for the desired time slot
-        if not Availability.objects.filter(
-            date=local_start_time.date(),
-            start_time__lte=local_start_time.time(),
-            end_time__gte=local_end_time.time(),
-            is_available=True,
-        ).exists():
-            raise serializers.ValidationError("The selected time slot is unavailable.")
-
-        # Check for overlapping bookings, excluding the current booking if updating
-        overlapping_bookings = (
-            Booking.objects.filter(date_time__lt=end_time, date_time__gte=start_time)
-            .exclude(id=self.instance.id if self.instance else None)
-            .exists()
-        )
-
-        if overlapping_bookings:
-            raise serializers.ValidationError(
-                "The booking time overlaps with an existing booking."
-            )
+        self.slot = resolve_slot(start_time, services, instance=self.instance)
 
         return data
@@ -0,0 +1,100 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import catalogue, changes
+from .models import Availability, Booking, CalendarChange, Category, Service
+
+
+def refresh_bookings(booking_ids):
+    # Recompute the stored schedule and log the bookings as updated
+    booking_ids = list(booking_ids)
+    if booking_ids:
+        Booking.objects.filter(id__in=booking_ids).refresh_schedule()
+        changes.log(CalendarChange.BOOKING, booking_ids, CalendarChange.UPDATED)
+
+
+# Recompute end_time/total_worktime when the services of a booking change
+@receiver(m2m_changed, sender=Booking.services.through)
+def booking_services_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # instance is a Service, pk_set holds booking ids
+        if action == "pre_clear":
+            instance._cleared_booking_ids = list(
+                instance.booking_set.values_list("id", flat=True)
+            )
+        elif action == "post_clear":
+            refresh_bookings(getattr(instance, "_cleared_booking_ids", []))
+        elif action in ("post_add", "post_remove"):
+            refresh_bookings(pk_set)
+        return
+
+    # Serializers store the schedule themselves, see serializers.set_services
+    if getattr(instance, "_schedule_current", False):
+        return
+    if action in ("post_add", "post_remove", "post_clear"):
+        refresh_bookings([instance.id])
+        # Keep the in-memory instance in step with the stored columns
+        instance.refresh_from_db(fields=["total_worktime", "end_time"])
+
+
+# Remember the previous worktime so unrelated edits skip the recompute
+@receiver(pre_save, sender=Service)
+def service_pre_save(sender, instance, **kwargs):
+    instance._previous_worktime = (
+        Service.objects.filter(pk=instance.pk)
+        .values_list("worktime", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Service)
+def service_worktime_changed(sender, instance, created, **kwargs):
+    if created or instance._previous_worktime == instance.worktime:
+        return
+    refresh_bookings(instance.booking_set.values_list("id", flat=True))
+
+
+# Deleting a service drops its through rows without an m2m_changed signal
+@receiver(pre_delete, sender=Service)
+def service_pre_delete(sender, instance, **kwargs):
+    instance._affected_booking_ids = list(
+        instance.booking_set.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    refresh_bookings(instance._affected_booking_ids)
+
+
+# Any change to services or categories starts a new catalogue version
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalogue_changed(sender, **kwargs):
+    catalogue.invalidate()
+
+
+# Feed the delta sync change log
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Availability)
+def calendar_object_saved(sender, instance, created, **kwargs):
+    model = CalendarChange.BOOKING if sender is Booking else CalendarChange.AVAILABILITY
+    action = CalendarChange.CREATED if created else CalendarChange.UPDATED
+    changes.log(model, [instance.pk], action)
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Availability)
+def calendar_object_deleted(sender, instance, **kwargs):
+    model = CalendarChange.BOOKING if sender is Booking else CalendarChange.AVAILABILITY
+    changes.log(model, [instance.pk], CalendarChange.DELETED)
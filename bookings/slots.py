@@ -0,0 +1,115 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.timezone import localtime, make_aware
+
+from .models import Availability, Booking
+
+# Granularity of the start times offered to clients (matches the calendar)
+SLOT_STEP = timedelta(minutes=30)
+
+
+def _local_naive(value):
+    # Availability rows are stored as naive local date/time values
+    return localtime(value).replace(tzinfo=None)
+
+
+def day_bounds(date_from, date_to):
+    # Aware datetimes covering the local days date_from..date_to (inclusive)
+    return (
+        make_aware(datetime.combine(date_from, datetime.min.time())),
+        make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time())),
+    )
+
+
+def merge_intervals(intervals):
+    """
+    Sort (start, end) pairs and merge the overlapping ones, so the result is
+    a list of disjoint intervals ordered by start.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract_intervals(window_start, window_end, busy, busy_starts):
+    """
+    Return the free gaps of [window_start, window_end) once the merged
+    ``busy`` intervals are removed. ``busy_starts`` is the list of busy start
+    times used to bisect straight to the first interval that can overlap.
+    """
+    gaps = []
+    cursor = window_start
+    # The interval just before the bisect point may still run into the window
+    index = max(bisect_right(busy_starts, window_start) - 1, 0)
+    while index < len(busy) and busy[index][0] < window_end:
+        busy_start, busy_end = busy[index]
+        if busy_end > cursor:
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            cursor = busy_end
+        index += 1
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+def slot_starts(window_start, gaps, duration, step=SLOT_STEP, not_before=None):
+    """
+    Yield the start times, aligned to ``step`` from ``window_start``, at which
+    ``duration`` fits entirely inside one of the free ``gaps``.
+    """
+    for gap_start, gap_end in gaps:
+        offset = gap_start - window_start
+        steps = -(-offset // step)  # ceil division on timedelta
+        start = window_start + steps * step
+        while start + duration <= gap_end:
+            if not_before is None or start >= not_before:
+                yield start
+            start += step
+
+
+def find_free_slots(date_from, date_to, duration, step=SLOT_STEP):
+    """
+    Compute the bookable start times between ``date_from`` and ``date_to``
+    (inclusive) for a booking lasting ``duration``.
+
+    Availability windows and bookings for the range are loaded once, bookings
+    are merged into a sorted interval list and every window is then cut by
+    bisecting into it, so a request costs O((A + B) log B).
+    """
+    range_start, range_end = day_bounds(date_from, date_to)
+
+    windows = Availability.objects.filter(
+        date__gte=date_from, date__lte=date_to, is_available=True
+    ).order_by("date", "start_time")
+
+    bookings = Booking.objects.overlapping(range_start, range_end).only(
+        "date_time", "end_time", "total_worktime"
+    )
+
+    busy = merge_intervals(
+        (_local_naive(booking.date_time), _local_naive(booking.calculate_end_time()))
+        for booking in bookings
+    )
+    busy_starts = [start for start, _ in busy]
+    not_before = _local_naive(timezone.now())
+
+    slots = []
+    for window in windows:
+        window_start = datetime.combine(window.date, window.start_time)
+        window_end = datetime.combine(window.date, window.end_time)
+        gaps = subtract_intervals(window_start, window_end, busy, busy_starts)
+        slots.extend(
+            make_aware(start)
+            for start in slot_starts(
+                window_start, gaps, duration, step=step, not_before=not_before
+            )
+        )
+    return slots
@@ -0,0 +1,84 @@
+import json
+import time
+
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+
+from accounts.authentication import REVOKED, acurrent_version, current_version
+
+from .async_views import authenticate
+from .events import get_broker
+
+HEARTBEAT_SECONDS = 15
+# Connections are recycled so a vanished client is never held for long,
+# EventSource reconnects on its own after RETRY_MILLISECONDS
+STREAM_SECONDS = 5 * 60
+RETRY_MILLISECONDS = 3000
+# EventSource cannot send headers, so browsers open the stream with a ticket
+# in the query string instead of their access token. URLs end up in access
+# logs, so a ticket only opens the stream and only for this many seconds
+TICKET_SECONDS = 60
+
+signer = signing.TimestampSigner(salt="bookings.calendar-stream")
+
+
+def make_ticket(user):
+    # Bound to the user's auth_version: logging out everywhere, a password
+    # change or deactivation revokes the tickets handed out before
+    return signer.sign(f"{user.pk}:{current_version(user.pk)}")
+
+
+async def ticket_user_id(ticket):
+    """
+    Return the user id of a valid ``ticket`` whose user is still active at
+    the version it was issued for, or None.
+    """
+    try:
+        user_id, version = signer.unsign(ticket, max_age=TICKET_SECONDS).split(":")
+        user_id, version = int(user_id), int(version)
+    except (signing.BadSignature, ValueError):
+        return None
+    if version == REVOKED or await acurrent_version(user_id) != version:
+        return None
+    return user_id
+
+
+def format_event(event):
+    return f"event: change\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream():
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    deadline = time.monotonic() + STREAM_SECONDS
+    subscription = get_broker().subscribe(heartbeat=HEARTBEAT_SECONDS)
+    try:
+        async for event in subscription:
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield format_event(event)
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        await subscription.aclose()
+
+
+# Stream Live Calendar Changes As Server-Sent Events (USER, ASGI)
+async def calendar_stream(request):
+    # A ticket from CalendarStreamTicketView, or the access token in the
+    # Authorization header for clients that can send one. Both check the
+    # user's version, which costs a cache lookup
+    ticket = request.GET.get("ticket")
+    if ticket:
+        authenticated = await ticket_user_id(ticket) is not None
+    else:
+        authenticated = await authenticate(request) is not None
+    if not authenticated:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
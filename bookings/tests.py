@@ -1,3 +1,1004 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from importlib import import_module
+from itertools import count
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import make_aware
+from rest_framework.test import APIClient
+
+from accounts.tokens import UserRefreshToken
+from backend import benchmark, perf
+from backend.testing import clear_caches, isolated_caches
+
+from . import changes, idempotency, schedules, slots, streams, transfer
+from .management.commands.check_budgets import DEFAULT_BUDGETS
+from .models import (
+    Availability,
+    Booking,
+    CalendarChange,
+    Category,
+    IdempotencyKey,
+    RecurringSchedule,
+    Service,
+)
+
+User = get_user_model()
+
+
+def make_user(index=0, **extra_fields):
+    return User.objects.create_user(
+        email=f"user{index}@example.com", password="test-password", **extra_fields
+    )
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class BookingFixtureMixin:
+    def setUp(self):
+        self.service = Service.objects.create(name="Cut", worktime=timedelta(hours=1))
+        self.day = timezone.localdate() + timedelta(days=1)
+        Availability.objects.create(
+            date=self.day, start_time=time(8), end_time=time(18)
+        )
+        self.start = self.at(9)
+
+    def at(self, hour, day=None):
+        return make_aware(datetime.combine(day or self.day, time(hour)))
+
+    def book(self, client, start, **extra):
+        return client.post(
+            reverse("booking-create"),
+            {"service_ids": [self.service.id], "date_time": start},
+            format="json",
+            secure=True,
+            **extra,
+        )
+
+    def make_bookings(self, user, count):
+        # One booking a day from self.day on, written without the API
+        bookings = []
+        for offset in range(count):
+            booking = Booking.objects.create(
+                user=user,
+                date_time=self.at(9, self.day + timedelta(days=offset)),
+                total_worktime=self.service.worktime,
+            )
+            booking.services.add(self.service)
+            bookings.append(booking)
+        return bookings
+
+
+@isolated_caches
+class ConcurrentBookingTests(BookingFixtureMixin, TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        super().setUp()
+        self.users = [make_user(index) for index in range(self.THREADS)]
+
+    def test_one_of_many_parallel_bookings_of_a_slot_wins(self):
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def book(user):
+            client = api_client(user)
+            try:
+                barrier.wait()
+                statuses.append(self.book(client, self.start).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [400] * (self.THREADS - 1))
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+@isolated_caches
+class IdempotencyKeyTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(make_user())
+
+    def test_retry_replays_the_first_response(self):
+        first = self.book(self.client, self.start, HTTP_IDEMPOTENCY_KEY="retry")
+        retry = self.book(self.client, self.start, HTTP_IDEMPOTENCY_KEY="retry")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_reused_key_with_another_body_is_refused(self):
+        self.book(self.client, self.start, HTTP_IDEMPOTENCY_KEY="reused")
+        response = self.book(self.client, self.at(11), HTTP_IDEMPOTENCY_KEY="reused")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_expired_keys_are_pruned_and_reusable(self):
+        self.book(self.client, self.start, HTTP_IDEMPOTENCY_KEY="old")
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - idempotency.RETENTION - timedelta(minutes=1)
+        )
+        response = self.book(self.client, self.at(11), HTTP_IDEMPOTENCY_KEY="old")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 2)
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - idempotency.RETENTION - timedelta(minutes=1)
+        )
+        self.assertEqual(idempotency.prune(), 1)
+
+
+@isolated_caches
+class BookingEditTests(BookingFixtureMixin, TestCase):
+    def test_editing_the_services_replaces_them(self):
+        client = api_client(make_user())
+        booking_id = self.book(client, self.start).json()["id"]
+        trim = Service.objects.create(name="Trim", worktime=timedelta(minutes=30))
+
+        response = client.patch(
+            reverse("booking-edit", args=[booking_id]),
+            {"service_ids": [trim.id], "date_time": self.start},
+            format="json",
+            secure=True,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        booking = Booking.objects.get(id=booking_id)
+        self.assertEqual(list(booking.services.all()), [trim])
+        self.assertEqual(booking.end_time, self.start + trim.worktime)
+
+
+@isolated_caches
+class BookingOverlapTests(BookingFixtureMixin, TestCase):
+    def test_a_booking_running_into_the_next_one_is_refused(self):
+        client = api_client(make_user())
+        self.assertEqual(self.book(client, self.start).status_code, 201)
+
+        response = self.book(client, self.start - timedelta(minutes=30))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_constraint_migration_lists_the_overlapping_bookings(self):
+        migration = import_module("bookings.migrations.0003_booking_overlap")
+        user = make_user()
+        first, _ = self.make_bookings(user, 2)
+        second = Booking.objects.create(
+            user=user,
+            date_time=self.start + timedelta(minutes=30),
+            total_worktime=self.service.worktime,
+        )
+        schema_editor = mock.Mock()
+        schema_editor.connection.vendor = "postgresql"
+
+        with self.assertRaisesMessage(
+            CommandError, f"Overlapping booking ids: {first.id} and {second.id}."
+        ):
+            migration.add_exclusion_constraint(apps, schema_editor)
+        schema_editor.execute.assert_not_called()
+
+
+@isolated_caches
+class ResolveSlotQueryTests(BookingFixtureMixin, TestCase):
+    def selects_from(self, queries, table):
+        return [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and f'FROM "{table}"' in query["sql"]
+        ]
+
+    def test_booking_post_reads_the_window_and_overlaps_once(self):
+        client = api_client(make_user())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.book(client, self.start)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.selects_from(queries, "bookings_availability")), 1)
+        self.assertEqual(len(self.selects_from(queries, "bookings_booking")), 1)
+
+
+def clock(hour, minute=0):
+    return datetime(2026, 1, 5, hour, minute)
+
+
+class SlotIntervalTests(SimpleTestCase):
+    def test_overlapping_and_touching_intervals_are_merged(self):
+        merged = slots.merge_intervals(
+            [
+                (clock(12), clock(13)),
+                (clock(9), clock(10)),
+                (clock(10), clock(11)),
+                (clock(12, 30), clock(12, 45)),
+            ]
+        )
+
+        self.assertEqual(merged, [[clock(9), clock(11)], [clock(12), clock(13)]])
+
+    def test_busy_intervals_are_cut_out_of_the_window(self):
+        busy = [[clock(7), clock(9)], [clock(12), clock(13)], [clock(17), clock(19)]]
+        gaps = slots.subtract_intervals(
+            clock(8), clock(18), busy, [start for start, _ in busy]
+        )
+
+        self.assertEqual(gaps, [(clock(9), clock(12)), (clock(13), clock(17))])
+
+    def starts(self, gap_start, gap_end, **kwargs):
+        return list(
+            slots.slot_starts(
+                clock(8), [(gap_start, gap_end)], timedelta(hours=1), **kwargs
+            )
+        )
+
+    def test_starts_are_aligned_to_the_window_grid(self):
+        self.assertEqual(
+            self.starts(clock(9, 10), clock(11)), [clock(9, 30), clock(10)]
+        )
+
+    def test_starts_before_not_before_are_skipped(self):
+        self.assertEqual(
+            self.starts(clock(9), clock(11), not_before=clock(9, 45)), [clock(10)]
+        )
+
+    def test_a_gap_of_exactly_the_duration_fits_once(self):
+        self.assertEqual(self.starts(clock(9), clock(10)), [clock(9)])
+
+    def test_a_gap_shorter_than_the_duration_has_no_start(self):
+        self.assertEqual(self.starts(clock(9), clock(9, 50)), [])
+        self.assertEqual(self.starts(clock(9, 10), clock(10, 10)), [])
+
+
+@isolated_caches
+class FreeSlotsViewTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(make_user())
+
+    def free_slots(self, day, service_ids):
+        return self.client.get(
+            reverse("availability-free-slots"),
+            {"date_from": day, "date_to": day, "service_ids": service_ids},
+            secure=True,
+        )
+
+    def test_a_booking_from_the_day_before_blocks_the_window(self):
+        next_day = self.day + timedelta(days=1)
+        Availability.objects.create(date=next_day, start_time=time(0), end_time=time(3))
+        Booking.objects.create(
+            user=make_user(1),
+            date_time=self.at(23),
+            total_worktime=timedelta(hours=2),
+        )
+
+        response = self.free_slots(next_day, self.service.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["slots"],
+            [
+                self.at(1, next_day).isoformat(),
+                self.at(1, next_day).replace(minute=30).isoformat(),
+                self.at(2, next_day).isoformat(),
+            ],
+        )
+
+    def test_an_unknown_service_is_refused(self):
+        response = self.free_slots(self.day, f"{self.service.id},999999")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("service_ids", response.json())
+
+
+@isolated_caches
+class BookingPaginationTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.make_bookings(self.user, 3)
+
+    def test_booking_lists_are_paginated_by_default(self):
+        client = api_client(make_user(1, is_staff=True))
+        for name in ("booking-list", "booking-list-all", "admin-booking-list-create"):
+            with self.subTest(name):
+                response = client.get(reverse(name), secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("results", response.json())
+
+    def test_pages_follow_the_cursor(self):
+        client = api_client(self.user)
+        first = client.get(reverse("booking-list"), {"page_size": 2}, secure=True)
+        second = client.get(first.json()["next"], secure=True)
+
+        self.assertEqual(len(first.json()["results"]), 2)
+        self.assertEqual(len(second.json()["results"]), 1)
+        self.assertIsNone(second.json()["next"])
+
+    async def test_async_twin_returns_the_same_page(self):
+        token = UserRefreshToken.for_user(self.user)
+        response = await AsyncClient().get(
+            reverse("async-booking-list"),
+            {"page_size": 2},
+            secure=True,
+            headers={"Authorization": f"Bearer {token.access_token}"},
+        )
+        expected = await sync_to_async(
+            lambda: api_client(self.user)
+            .get(reverse("booking-list"), {"page_size": 2}, secure=True)
+            .json()
+        )()
+
+        # Only the path in the "next" link differs
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], expected["results"])
+        self.assertIsNotNone(response.json()["next"])
+
+
+def columnar_rows(payload):
+    # The objects of a ?format=columnar payload, services resolved again
+    columns = payload["columns"]
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    if "services" in payload:
+        for row in rows:
+            row["services"] = [payload["services"][str(i)] for i in row["services"]]
+    return rows
+
+
+@isolated_caches
+class ColumnarListTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        self.user = make_user()
+        self.make_bookings(self.user, 3)
+        self.make_bookings(make_user(1), 2)
+        self.admin = make_user(2, is_staff=True)
+
+    def test_columnar_lists_decode_to_the_default_rows(self):
+        lists = [
+            (self.user, "booking-list"),
+            (self.user, "booking-list-all"),
+            (self.user, "availability-list-create"),
+            (self.admin, "admin-booking-list-create"),
+            (self.admin, "admin-availability-list-create"),
+        ]
+        for user, name in lists:
+            with self.subTest(name):
+                client = api_client(user)
+                default = client.get(reverse(name), secure=True).json()
+                columnar = client.get(
+                    reverse(name), {"format": "columnar"}, secure=True
+                ).json()
+                if "results" in default:
+                    default, columnar = default["results"], columnar["results"]
+
+                self.assertTrue(default)
+                self.assertEqual(columnar["count"], len(default))
+                self.assertEqual(columnar_rows(columnar), default)
+
+
+@isolated_caches
+class HotQueryIndexTests(BookingFixtureMixin, TestCase):
+    """
+    The indexes of migration 0005 serve the lookups they were added for.
+    PostgreSQL plans a sequential scan for tables this small, so it is
+    turned off there to see which index the planner would pick.
+    """
+
+    def hot_queries(self):
+        user = make_user()
+        end = self.start + timedelta(hours=1)
+        return {
+            # serializers.resolve_slot
+            "availability_open_idx": Availability.objects.filter(
+                date=self.day,
+                start_time__lte=time(9),
+                end_time__gte=time(10),
+                is_available=True,
+            ).order_by("start_time"),
+            # AdminAvailabilityListCreateView.create overlap check
+            "availability_day_idx": Availability.objects.filter(
+                date=self.day, start_time__lt=time(10), end_time__gt=time(9)
+            ),
+            # BookingListView
+            "booking_user_start_idx": Booking.objects.filter(user=user).order_by(
+                "date_time", "id"
+            ),
+            # Overlap checks and the free-slot engine
+            "booking_interval_idx": Booking.objects.overlapping(self.start, end),
+        }
+
+    def assert_plans_use_indexes(self):
+        for index, queryset in self.hot_queries().items():
+            with self.subTest(index):
+                self.assertIn(index, queryset.explain())
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+    def test_sqlite_plans_use_the_indexes(self):
+        self.assert_plans_use_indexes()
+
+    @skipUnless(connection.vendor == "postgresql", "EXPLAIN output is PostgreSQL's")
+    def test_postgresql_plans_use_the_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assert_plans_use_indexes()
+
+
+@isolated_caches
+class ConditionalListTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.bookings = self.make_bookings(make_user(1), 2)
+        self.client = api_client(self.user)
+
+    def get(self, **headers):
+        return self.client.get(reverse("booking-list-all"), secure=True, **headers)
+
+    def test_renaming_a_service_changes_the_etag(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.service.name = "Trim"
+        self.service.save()
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleting_a_booking_moves_last_modified(self):
+        # Last-Modified has a one second resolution
+        earlier = timezone.now() - timedelta(minutes=1)
+        Booking.objects.update(updated_at=earlier)
+        Service.objects.update(updated_at=earlier)
+        last_modified = self.get()["Last-Modified"]
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304
+        )
+
+        self.bookings[0].delete()
+
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200
+        )
+
+
+@isolated_caches
+class CatalogueCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.category = Category.objects.create(name="Hair")
+        self.service = Service.objects.create(
+            name="Cut", worktime=timedelta(hours=1), category=self.category
+        )
+
+    def get(self, url=None, **headers):
+        return self.client.get(
+            url or reverse("category-list"), secure=True, headers=headers
+        )
+
+    def test_a_matching_if_none_match_is_answered_from_the_cache(self):
+        etag = self.get()["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.get(if_none_match='"stale"').status_code, 200)
+
+    def test_saving_or_deleting_starts_a_new_version(self):
+        categories = reverse("category-list")
+        services = reverse("services-by-category", args=[self.category.id])
+
+        def rename(instance):
+            instance.name += " & Beard"
+            instance.save()
+
+        changes = [
+            ("service saved", services, partial(rename, self.service)),
+            ("service deleted", services, self.service.delete),
+            ("category saved", categories, partial(rename, self.category)),
+            ("category deleted", categories, self.category.delete),
+        ]
+        for label, url, change in changes:
+            with self.subTest(label):
+                etag = self.get(url)["ETag"]
+                change()
+                response = self.get(url, if_none_match=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+        self.assertEqual(self.get(categories).json(), [])
+
+
+@isolated_caches
+class AdminCalendarTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        self.client = api_client(make_user(is_staff=True))
+        self.customer = make_user(1, name="Bo", surname="Booker")
+
+    def calendar(self):
+        response = self.client.get(
+            reverse("admin-calendar"),
+            {"from": self.day.isoformat(), "to": self.day.isoformat()},
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_services_availability_and_bookings_are_merged(self):
+        booking, _ = self.make_bookings(self.customer, 2)
+
+        calendar = self.calendar()
+
+        self.assertEqual(
+            [service["id"] for service in calendar["services"]], [self.service.id]
+        )
+        self.assertEqual(
+            [(row["date"], row["start_time"]) for row in calendar["availability"]],
+            [(self.day.isoformat(), "08:00:00")],
+        )
+        self.assertEqual(len(calendar["bookings"]), 1)
+        row = calendar["bookings"][0]
+        self.assertEqual(
+            {key: row[key] for key in ("id", "user", "user_name", "mine")},
+            {
+                "id": booking.id,
+                "user": self.customer.id,
+                "user_name": "Bo Booker",
+                "mine": False,
+            },
+        )
+        self.assertEqual(row["service_ids"], [self.service.id])
+        self.assertEqual(
+            datetime.fromisoformat(row["end_time"]), self.at(9) + timedelta(hours=1)
+        )
+
+    def test_no_isolation_level_is_set_inside_a_transaction(self):
+        # TestCase wraps every test in a transaction, as ATOMIC_REQUESTS would
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            with CaptureQueriesContext(connection) as queries:
+                self.calendar()
+
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith("SET TRANSACTION")]
+        )
+
+
+class CalendarChangeCursorTests(TestCase):
+    def change(self, change_id, age):
+        change = CalendarChange.objects.create(
+            id=change_id,
+            model=CalendarChange.BOOKING,
+            object_id=change_id,
+            action=CalendarChange.UPDATED,
+        )
+        CalendarChange.objects.filter(id=change_id).update(
+            created_at=timezone.now() - age
+        )
+        return change
+
+    def test_a_change_committed_late_with_a_lower_id_is_delivered(self):
+        old = changes.SETTLE_TIME + timedelta(seconds=1)
+        self.change(1, old)
+        # Change 3 committed while the transaction holding id 2 is still open
+        self.change(3, timedelta())
+
+        actions, cursor, has_more = changes.collect(0)
+        self.assertEqual(set(actions), {("booking", 1), ("booking", 3)})
+        self.assertEqual(cursor, 1)
+        self.assertEqual(changes.settled_change_id(), 1)
+
+        self.change(2, timedelta(seconds=1))
+        actions, cursor, has_more = changes.collect(cursor)
+        self.assertEqual(set(actions), {("booking", 2), ("booking", 3)})
+        self.assertEqual(cursor, 1)
+        self.assertFalse(has_more)
+
+    def test_settled_changes_move_the_cursor(self):
+        old = changes.SETTLE_TIME + timedelta(seconds=1)
+        for change_id in (1, 2, 3):
+            self.change(change_id, old)
+
+        actions, cursor, has_more = changes.collect(0, limit=2)
+        self.assertEqual(cursor, 2)
+        self.assertTrue(has_more)
+        self.assertEqual(changes.settled_change_id(), 3)
+
+
+@isolated_caches
+class CalendarStreamTicketTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = make_user()
+
+    def ticket(self):
+        response = api_client(self.user).post(
+            reverse("calendar-stream-ticket"), secure=True
+        )
+        return response.json()["ticket"]
+
+    async def open_stream(self, **params):
+        # The event stream itself is never iterated
+        response = await AsyncClient().get(
+            reverse("calendar-stream"), params, secure=True
+        )
+        return response.status_code
+
+    async def test_ticket_opens_the_stream(self):
+        ticket = await sync_to_async(self.ticket)()
+        self.assertEqual(await self.open_stream(ticket=ticket), 200)
+
+    async def test_access_token_in_the_query_is_refused(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.assertEqual(await self.open_stream(access_token=str(token)), 401)
+
+    def deactivate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+    async def test_ticket_is_revoked_with_the_user_version(self):
+        ticket = await sync_to_async(self.ticket)()
+        await sync_to_async(self.deactivate)()
+
+        self.assertEqual(await self.open_stream(ticket=ticket), 401)
+
+    async def test_expired_ticket_is_refused(self):
+        issued = int(timezone.now().timestamp()) - streams.TICKET_SECONDS - 1
+        with mock.patch.object(
+            streams.signer, "timestamp", return_value=signing.b62_encode(issued)
+        ):
+            ticket = await sync_to_async(self.ticket)()
+
+        self.assertEqual(await self.open_stream(ticket=ticket), 401)
+
+
+@isolated_caches
+class ExportStreamTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        self.admin = make_user(is_staff=True)
+        self.make_bookings(self.admin, 3)
+        self.pulled = []
+
+    def counted_rows(self, queryset):
+        # transfer.export_rows() that records the bookings read so far
+        for row in self.export_rows(queryset):
+            self.pulled.append(row["id"])
+            yield row
+
+    def export(self):
+        return api_client(self.admin).get(
+            reverse("admin-booking-export"), {"format": "jsonl"}, secure=True
+        )
+
+    def test_export_rows_are_read_while_streaming(self):
+        self.export_rows = transfer.export_rows
+        with mock.patch.object(transfer, "export_rows", self.counted_rows):
+            response = self.export()
+            self.assertTrue(response.streaming)
+            self.assertEqual(self.pulled, [])
+            body = b"".join(response.streaming_content)
+
+        self.assertEqual(len(body.splitlines()), 3)
+        self.assertEqual(len(self.pulled), 3)
+
+    async def test_asgi_export_is_an_async_stream(self):
+        expected = await sync_to_async(
+            lambda: b"".join(self.export().streaming_content)
+        )()
+        token = UserRefreshToken.for_user(self.admin).access_token
+        self.export_rows = transfer.export_rows
+        with mock.patch.object(transfer, "export_rows", self.counted_rows):
+            response = await AsyncClient().get(
+                reverse("admin-booking-export"),
+                {"format": "jsonl"},
+                secure=True,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            self.assertTrue(response.is_async)
+            self.assertEqual(self.pulled, [])
+            body = b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(body, expected)
+        self.assertEqual(len(self.pulled), 3)
+
+
+class GenerateAvailabilityTests(TestCase):
+    # Mondays 9-12 through November 2026, except the 16th
+    MONDAYS = [date(2026, 11, 9), date(2026, 11, 23), date(2026, 11, 30)]
+
+    def setUp(self):
+        self.schedule = RecurringSchedule.objects.create(
+            weekday=0,
+            start_time=time(9),
+            end_time=time(12),
+            start_date=date(2026, 11, 4),
+            end_date=date(2026, 11, 30),
+            exceptions=["2026-11-16"],
+        )
+
+    def window_dates(self):
+        return list(
+            Availability.objects.order_by("date").values_list("date", flat=True)
+        )
+
+    def test_each_weekday_in_the_range_but_the_exceptions_gets_a_window(self):
+        created, skipped = schedules.generate_availability(self.schedule)
+
+        self.assertEqual((created, skipped), (3, []))
+        self.assertEqual(self.window_dates(), self.MONDAYS)
+        self.assertEqual(
+            set(Availability.objects.values_list("start_time", "end_time")),
+            {(time(9), time(12))},
+        )
+
+    def test_dates_with_an_overlapping_window_are_skipped(self):
+        Availability.objects.create(
+            date=self.MONDAYS[1], start_time=time(11), end_time=time(14)
+        )
+        # Only touches the schedule's window
+        Availability.objects.create(
+            date=self.MONDAYS[2], start_time=time(12), end_time=time(14)
+        )
+
+        created, skipped = schedules.generate_availability(self.schedule)
+
+        self.assertEqual((created, skipped), (2, [self.MONDAYS[1]]))
+
+    def test_generating_again_creates_nothing(self):
+        schedules.generate_availability(self.schedule)
+
+        created, skipped = schedules.generate_availability(self.schedule)
+
+        self.assertEqual((created, skipped), (0, self.MONDAYS))
+        self.assertEqual(Availability.objects.count(), 3)
+
+    def test_created_windows_are_logged_for_the_sync_feeds(self):
+        schedules.generate_availability(self.schedule)
+
+        self.assertEqual(
+            set(CalendarChange.objects.values_list("model", "object_id", "action")),
+            {
+                (CalendarChange.AVAILABILITY, pk, CalendarChange.CREATED)
+                for pk in Availability.objects.values_list("pk", flat=True)
+            },
+        )
+        self.assertEqual(CalendarChange.objects.count(), 3)
+
+
+@isolated_caches
+class ImportBatchTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.worktimes = {self.service.id: self.service.worktime}
+
+    def row(self, start):
+        return {
+            "user": self.user.email,
+            "date_time": start.isoformat(),
+            "services": [self.service.id],
+        }
+
+    def import_rows(self, *starts):
+        report = transfer.ImportReport()
+        batch = [(number, self.row(start)) for number, start in enumerate(starts, 1)]
+        transfer.import_batch(batch, self.worktimes, report)
+        return report.as_dict()
+
+    def test_distant_rows_are_checked_one_window_at_a_time(self):
+        far = self.day + transfer.OVERLAP_WINDOW * 10
+        with CaptureQueriesContext(connection) as queries:
+            report = self.import_rows(self.at(9, far), self.start, self.at(11))
+
+        overlap_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "bookings_booking"."date_time"')
+        ]
+        self.assertEqual(report["created"], 3)
+        self.assertEqual(len(overlap_queries), 2)
+
+    def test_a_failed_row_does_not_reject_the_batch(self):
+        write_bookings = transfer.write_bookings
+
+        def fail_second_row(accepted):
+            if any(number == 2 for number, _, _ in accepted):
+                raise IntegrityError("FOREIGN KEY constraint failed")
+            write_bookings(accepted)
+
+        with mock.patch.object(transfer, "write_bookings", fail_second_row):
+            report = self.import_rows(self.start, self.at(11))
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(
+            report["errors"],
+            [
+                {
+                    "row": 2,
+                    "error": "The user or a service of this row no longer exists.",
+                }
+            ],
+        )
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class QueryBudgetMixin:
+    """
+    assert_flat_queries() loads a list at two sizes and fails when its query
+    count grows with the number of rows, the N+1 pattern.
+    """
+
+    SIZES = (2, 12)
+
+    def count_queries(self, client, url):
+        # Cold caches, so both sizes run the same queries
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def assert_flat_queries(self, client, url, add_rows):
+        counts = []
+        rows = 0
+        for size in self.SIZES:
+            add_rows(rows, size)
+            rows = size
+            counts.append(self.count_queries(client, url))
+        self.assertEqual(
+            counts[0], counts[1], f"{url}: {counts} queries for {self.SIZES} rows"
+        )
+
+
+@isolated_caches
+class ListQueryBudgetTests(QueryBudgetMixin, BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name="Hair")
+        self.staff = api_client(make_user(0, is_staff=True))
+        self.user_indexes = count(1)
+
+    def add_bookings(self, first, last, user=None):
+        # Each booking by a new user unless ``user`` is given
+        for offset in range(first, last):
+            booking = Booking.objects.create(
+                user=user or make_user(next(self.user_indexes)),
+                date_time=self.at(9, self.day + timedelta(days=offset)),
+                total_worktime=self.service.worktime,
+            )
+            booking.services.add(self.service)
+
+    def add_availability(self, first, last):
+        for offset in range(first, last):
+            Availability.objects.create(
+                date=self.day + timedelta(days=offset + 1),
+                start_time=time(8),
+                end_time=time(18),
+            )
+
+    def add_services(self, first, last):
+        for index in range(first, last):
+            Service.objects.create(
+                name=f"Service {index}",
+                worktime=timedelta(minutes=30),
+                category=self.category,
+            )
+
+    def test_booking_lists(self):
+        for name in ("booking-list-all", "admin-booking-list-create"):
+            with self.subTest(name):
+                Booking.objects.all().delete()
+                self.assert_flat_queries(self.staff, reverse(name), self.add_bookings)
+
+    def test_own_booking_list(self):
+        user = make_user(next(self.user_indexes))
+        self.assert_flat_queries(
+            api_client(user),
+            reverse("booking-list"),
+            partial(self.add_bookings, user=user),
+        )
+
+    def test_availability_lists(self):
+        for name in ("availability-list-create", "admin-availability-list-create"):
+            with self.subTest(name):
+                Availability.objects.exclude(date=self.day).delete()
+                self.assert_flat_queries(
+                    self.staff, reverse(name), self.add_availability
+                )
+
+    def test_service_lists(self):
+        urls = [
+            reverse("service-list"),
+            reverse("admin-service-list-create"),
+            reverse("services-by-category", args=[self.category.id]),
+        ]
+        for url in urls:
+            with self.subTest(url):
+                Service.objects.exclude(id=self.service.id).delete()
+                self.assert_flat_queries(self.staff, url, self.add_services)
+
+
+@isolated_caches
+class ServerTimingTests(BookingFixtureMixin, TestCase):
+    def test_serializers_are_timed_apart_from_rendering(self):
+        client = api_client(make_user(0, is_staff=True))
+        self.make_bookings(make_user(1), 3)
+
+        for name in ("admin-booking-list-create", "admin-service-list-create"):
+            with self.subTest(name):
+                response = client.get(reverse(name), secure=True)
+                timings = response.wsgi_request.timings
+                self.assertGreater(timings.serialize, 0)
+                self.assertFalse(timings.serializing)
+                self.assertIn("serialize;dur=", response["Server-Timing"])
+
+    def test_nested_serializer_time_is_counted_once(self):
+        timings = perf.RequestTimings()
+        token = perf.current.set(timings)
+        try:
+            with perf.serialize_timer():
+                with perf.serialize_timer():
+                    timings.db += 10.0
+        finally:
+            perf.current.reset(token)
+
+        # The queries are left out, so nothing remains of the 10 s
+        self.assertLess(timings.serialize, 1)
+
+
+@isolated_caches
+class EndpointBudgetTests(TransactionTestCase):
+    """
+    The query budgets of benchmarks/budgets.json, measured on the seeded
+    dataset like `manage.py check_budgets --queries-only`. Latency budgets
+    depend on the machine and are left to the command. Not a TestCase: its
+    transaction would turn the atomic blocks of the views into savepoints,
+    which cost queries of their own.
+    """
+
+    def setUp(self):
+        with open(DEFAULT_BUDGETS) as budget_file:
+            self.config = json.load(budget_file)
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual(benchmark.uncovered(self.config["budgets"]), [])
+
+    def test_endpoints_stay_within_their_query_budgets(self):
+        call_command("seed_benchmark", verbosity=0, **self.config["dataset"])
+        budgets = self.config["budgets"]
+        results = benchmark.run(iterations=1, warmup=1, only=set(budgets))
+        for result in results:
+            with self.subTest(result["name"]):
+                self.assertEqual(
+                    benchmark.over_budget(
+                        result, budgets[result["name"]], latency=False
+                    ),
+                    [],
+                )
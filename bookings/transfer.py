@@ -0,0 +1,339 @@
+import codecs
+import csv
+import json
+from bisect import bisect_right
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import changes
+from .models import Booking, CalendarChange, Service, is_overlap_error
+from .slots import merge_intervals
+
+FIELDS = ["id", "user", "date_time", "end_time", "services", "notes", "created_at"]
+FORMATS = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}
+
+# Rows read from the database or the upload, validated and written at a time
+CHUNK_SIZE = 2000
+# Lines joined into one chunk of the streamed response
+LINES_PER_CHUNK = 500
+# Rejected rows listed in the import report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# Longest span of rows checked against existing bookings with one query. A
+# sparse or unsorted upload becomes one indexed probe per row instead of a
+# scan of every booking between its first and last row
+OVERLAP_WINDOW = timedelta(days=7)
+
+OVERLAP_ERROR = "The booking time overlaps with an existing booking."
+
+
+def detect_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return FORMATS.get(extension)
+
+
+# ----------------------- EXPORT ----------
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    # One dict per booking, read from the database chunk_size rows at a time
+    bookings = (
+        queryset.select_related("user")
+        .only(
+            "id",
+            "date_time",
+            "end_time",
+            "notes",
+            "created_at",
+            "user__email",
+        )
+        .prefetch_related(
+            Prefetch("services", queryset=Service.objects.only("id", "worktime"))
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for booking in bookings:
+        yield {
+            "id": booking.id,
+            "user": booking.user.email,
+            "date_time": booking.date_time.isoformat(),
+            "end_time": booking.calculate_end_time().isoformat(),
+            "services": [service.id for service in booking.services.all()],
+            "notes": booking.notes or "",
+            "created_at": booking.created_at.isoformat(),
+        }
+
+
+class _Echo:
+    # Pseudo-buffer that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row["services"] = ";".join(str(service_id) for service_id in row["services"])
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+def stream(rows, fmt, lines_per_chunk=LINES_PER_CHUNK):
+    # Group the lines so the response is not written one tiny chunk per row
+    lines = csv_lines(rows) if fmt == "csv" else jsonl_lines(rows)
+    while True:
+        chunk = "".join(islice(lines, lines_per_chunk))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def astream(rows, fmt, lines_per_chunk=LINES_PER_CHUNK):
+    # stream() for an ASGI response. Django would collect a sync iterator
+    # into a list before sending it, this pulls one chunk at a time from the
+    # thread that holds the database cursor
+    chunks = stream(rows, fmt, lines_per_chunk)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+# ----------------------- IMPORT ----------
+
+
+def read_rows(lines, fmt):
+    """
+    Yield (line_number, row) pairs from an iterable of text lines. ``row`` is
+    a dict, or None when a JSON line cannot be parsed.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def parse_service_ids(value):
+    if isinstance(value, str):
+        value = [part for part in value.replace(",", ";").split(";") if part.strip()]
+    if not isinstance(value, list):
+        raise ValueError("services must be a list of service ids.")
+    try:
+        service_ids = [int(service_id) for service_id in value]
+    except (TypeError, ValueError):
+        raise ValueError("services must be a list of service ids.")
+    # The through table holds each booking/service pair once
+    return list(dict.fromkeys(service_ids))
+
+
+def parse_row(row, worktimes):
+    # Return (email, start, end, worktime, service_ids, notes) or raise ValueError
+    if row is None:
+        raise ValueError("Malformed line.")
+
+    start = parse_datetime(str(row.get("date_time") or ""))
+    if start is None:
+        raise ValueError("date_time must be an ISO 8601 datetime.")
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+
+    service_ids = parse_service_ids(row.get("services") or [])
+    if not service_ids:
+        raise ValueError("At least one service is required.")
+    unknown = [service_id for service_id in service_ids if service_id not in worktimes]
+    if unknown:
+        raise ValueError(f"Unknown services: {unknown}.")
+
+    email = str(row.get("user") or "").strip()
+    if not email:
+        raise ValueError("user must be the email of an existing user.")
+
+    worktime = sum((worktimes[service_id] for service_id in service_ids), timedelta())
+    return email, start, start + worktime, worktime, service_ids, row.get("notes") or ""
+
+
+def clusters(parsed, window=OVERLAP_WINDOW):
+    # Runs of rows, sorted by start, whose starts lie within one window
+    cluster = []
+    for item in parsed:
+        if cluster and item[2] - cluster[0][2] > window:
+            yield cluster
+            cluster = []
+        cluster.append(item)
+    if cluster:
+        yield cluster
+
+
+def busy_intervals(parsed):
+    # Existing bookings around the rows, one query per cluster of rows
+    intervals = []
+    for cluster in clusters(parsed):
+        intervals.extend(
+            Booking.objects.overlapping(
+                cluster[0][2], max(item[3] for item in cluster)
+            ).values_list("date_time", "end_time")
+        )
+    return merge_intervals(intervals)
+
+
+def overlaps(busy, busy_starts, start, end):
+    # busy is a sorted list of disjoint intervals, see slots.merge_intervals
+    index = bisect_right(busy_starts, start) - 1
+    if index >= 0 and busy[index][1] > start:
+        return True
+    return index + 1 < len(busy) and busy[index + 1][0] < end
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "error": message})
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def write_bookings(accepted):
+    # accepted holds (line_number, service_ids, booking) tuples
+    through = Booking.services.through
+    created = Booking.objects.bulk_create([booking for _, _, booking in accepted])
+    through.objects.bulk_create(
+        [
+            through(booking_id=booking.id, service_id=service_id)
+            for (_, service_ids, _), booking in zip(accepted, created)
+            for service_id in service_ids
+        ]
+    )
+    # bulk_create() sends no post_save, log the rows for the sync feeds
+    changes.log(
+        CalendarChange.BOOKING,
+        [booking.id for booking in created],
+        CalendarChange.CREATED,
+    )
+
+
+def import_batch(batch, worktimes, report):
+    parsed = []
+    for number, row in batch:
+        try:
+            parsed.append((number, *parse_row(row, worktimes)))
+        except ValueError as exc:
+            report.reject(number, str(exc))
+    if not parsed:
+        return
+
+    users = dict(
+        get_user_model()
+        .objects.filter(email__in={item[1] for item in parsed})
+        .values_list("email", "id")
+    )
+
+    # A query per cluster of rows for the bookings around them, then a bisect
+    # per row
+    parsed.sort(key=lambda item: item[2])
+    busy = busy_intervals(parsed)
+    busy_starts = [start for start, _ in busy]
+
+    accepted = []
+    last_end = None
+    for number, email, start, end, worktime, service_ids, notes in parsed:
+        if email not in users:
+            report.reject(number, f"Unknown user {email}.")
+        elif overlaps(busy, busy_starts, start, end):
+            report.reject(number, OVERLAP_ERROR)
+        elif last_end is not None and start < last_end:
+            report.reject(
+                number, "The booking time overlaps with another imported row."
+            )
+        else:
+            last_end = end
+            accepted.append(
+                (
+                    number,
+                    service_ids,
+                    Booking(
+                        user_id=users[email],
+                        date_time=start,
+                        end_time=end,
+                        total_worktime=worktime,
+                        notes=notes,
+                    ),
+                )
+            )
+    if not accepted:
+        return
+
+    try:
+        with transaction.atomic():
+            write_bookings(accepted)
+    except IntegrityError:
+        # A booking made, or a user or service deleted, while the batch was
+        # checked: write the rows one by one so only the conflicting ones fail
+        for row in accepted:
+            # The ids handed out by the failed insert were rolled back
+            row[2].pk = None
+            try:
+                with transaction.atomic():
+                    write_bookings([row])
+            except IntegrityError as exc:
+                report.reject(
+                    row[0],
+                    (
+                        OVERLAP_ERROR
+                        if is_overlap_error(exc)
+                        else "The user or a service of this row no longer exists."
+                    ),
+                )
+            else:
+                report.created += 1
+        return
+    report.created += len(accepted)
+
+
+def import_bookings(source, fmt, batch_size=CHUNK_SIZE):
+    """
+    Import bookings from ``source``, an iterable of byte lines such as an
+    uploaded file, in ``fmt`` ("csv" or "jsonl"). Rows are validated and
+    written batch_size at a time, so memory does not grow with the file.
+    Invalid or overlapping rows are skipped and listed in the report.
+    Availability windows are not checked, imports carry historical data.
+    """
+    worktimes = dict(Service.objects.values_list("id", "worktime"))
+    rows = read_rows(codecs.iterdecode(source, "utf-8-sig"), fmt)
+    report = ImportReport()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        import_batch(batch, worktimes, report)
+    return report.as_dict()
@@ -1,4 +1,6 @@
 from django.urls import path
+from .streams import calendar_stream
+from . import async_views
 from .views import (
     AdminServiceUpdateDeleteView,
     ServiceListView,
@@ -15,7 +17,16 @@ from .views import (
     BookingUpdateDeleteView,
     CategoryList,
     CategoryDetail,
-    ServicesByCategory
+    ServicesByCategory,
+    FreeSlotsView,
+    CalendarChangesView,
+    CalendarStreamTicketView,
+    AdminRecurringScheduleListCreateView,
+    AdminRecurringScheduleUpdateDeleteView,
+    AdminRecurringScheduleGenerateView,
+    AdminBookingExportView,
+    AdminBookingImportView,
+    AdminCalendarView,
 )
 
 urlpatterns = [
@@ -33,6 +44,16 @@ urlpatterns = [
         AdminBookingListCreateView.as_view(),
         name="admin-booking-list-create",
     ),
+    path(
+        "admin/bookings/export/",
+        AdminBookingExportView.as_view(),
+        name="admin-booking-export",
+    ),
+    path(
+        "admin/bookings/import/",
+        AdminBookingImportView.as_view(),
+        name="admin-booking-import",
+    ),
     path(
         "admin/bookings/<int:pk>/",
         AdminBookingUpdateDeleteView.as_view(),
@@ -58,6 +79,22 @@ urlpatterns = [
         AdminAvailabilityUpdateDeleteView.as_view(),
         name="admin-availability-update-delete",
     ),
+    path("admin/calendar/", AdminCalendarView.as_view(), name="admin-calendar"),
+    path(
+        "admin/schedules/",
+        AdminRecurringScheduleListCreateView.as_view(),
+        name="admin-schedule-list-create",
+    ),
+    path(
+        "admin/schedules/<int:pk>/",
+        AdminRecurringScheduleUpdateDeleteView.as_view(),
+        name="admin-schedule-update-delete",
+    ),
+    path(
+        "admin/schedules/<int:pk>/generate/",
+        AdminRecurringScheduleGenerateView.as_view(),
+        name="admin-schedule-generate",
+    ),
     # Public (User)
     path("services/", ServiceListView.as_view(), name="service-list"),
     path("bookings/", BookingCreateView.as_view(), name="booking-create"),
@@ -69,9 +106,46 @@ urlpatterns = [
         BookingUpdateDeleteView.as_view(),
         name="booking-edit",
     ),
+    path(
+        "availability/free-slots/",
+        FreeSlotsView.as_view(),
+        name="availability-free-slots",
+    ),
     path(
         "availability/",
         AvailabilityListCreateView.as_view(),
         name="availability-list-create",
     ),
+    path(
+        "calendar/changes/",
+        CalendarChangesView.as_view(),
+        name="calendar-changes",
+    ),
+    path("calendar/stream/", calendar_stream, name="calendar-stream"),
+    path(
+        "calendar/stream/ticket/",
+        CalendarStreamTicketView.as_view(),
+        name="calendar-stream-ticket",
+    ),
+    # Async twins of the read-heavy endpoints (ASGI)
+    path(
+        "async/bookings/mine/",
+        async_views.booking_list,
+        name="async-booking-list",
+    ),
+    path(
+        "async/bookings/all/",
+        async_views.all_bookings_list,
+        name="async-booking-list-all",
+    ),
+    path(
+        "async/services/",
+        async_views.service_list,
+        name="async-service-list",
+    ),
+    path(
+        "async/availability/",
+        async_views.availability_list,
+        name="async-availability-list",
+    ),
 ]
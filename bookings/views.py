@@ -1,7 +1,15 @@
 from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from .models import Booking, Service, Availability, Category
+from .models import (
+    Booking,
+    Service,
+    Availability,
+    Category,
+    CalendarChange,
+    RecurringSchedule,
+)
+from . import changes, idempotency
 from .serializers import (
     BookingSerializer,
     ServiceSerializer,
@@ -10,23 +18,50 @@ from .serializers import (
     AdminServiceSerializer,
     AdminBookingSerializer,
     CategorySerializer,
+    FreeSlotsQuerySerializer,
+    RecurringScheduleSerializer,
+    anonymized_booking_data,
+    lock_bookings,
+    overlap_guard,
 )
+from .slots import day_bounds, find_free_slots
+from .schedules import generate_availability
+from .catalogue import CatalogueCacheMixin
+from .conditional import WatermarkConditionalMixin
+from .compact import CompactListMixin
+from . import compact
+from .filters import BookingDateWindowFilter, parse_window_date
+from .pagination import BookingCursorPagination
+from .renderers import CSVRenderer, JSONLinesRenderer
+from . import streams, transfer
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from backend import perf
+from backend.renderers import FastJSONRenderer
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from datetime import timedelta
+from functools import partial
+from django.core import signing
+from django.db import connection, transaction
 from django.db.models import Q
-from django.utils.timezone import localtime
-from datetime import datetime
+from django.utils.duration import duration_string
 
 
 # List All Categories
-class CategoryList(generics.ListAPIView):
+class CategoryList(CatalogueCacheMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    catalogue_name = "categories"
 
 
-# List Services Filtered Based On Categories 
-class ServicesByCategory(generics.ListAPIView):
+# List Services Filtered Based On Categories
+class ServicesByCategory(CatalogueCacheMixin, generics.ListAPIView):
     serializer_class = ServiceSerializer
 
+    def get_catalogue_name(self):
+        return f"services-by-category:{self.kwargs.get('category_id')}"
+
     def get_queryset(self):
         category_id = self.kwargs.get("category_id")
         return Service.objects.filter(category_id=category_id)
@@ -58,21 +93,93 @@ class AdminServiceUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AdminServiceSerializer
     permission_classes = [IsAdminUser]
 
+    def perform_update(self, serializer):
+        # A longer worktime moves the end of its bookings, on PostgreSQL the
+        # booking_no_overlap constraint refuses it if they then overlap
+        with overlap_guard(
+            {"worktime": "Existing bookings of this service would overlap."}
+        ):
+            serializer.save()
+
 
 # (ADMIN) List and Create Bookings
-class AdminBookingListCreateView(generics.ListCreateAPIView):
-    queryset = Booking.objects.all()
+class AdminBookingListCreateView(CompactListMixin, generics.ListCreateAPIView):
+    queryset = Booking.objects.with_details().order_by("date_time", "id")
     serializer_class = AdminBookingSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [BookingDateWindowFilter]
+    pagination_class = BookingCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        bookings = self.filter_queryset(self.get_queryset())
+        return self.compact_list(
+            compact.admin_booking_records(bookings), compact.admin_booking_rows
+        )
 
 
 # (ADMIN) Retrieve, Update, and Delete Booking
 class AdminBookingUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Booking.objects.all()
+    queryset = Booking.objects.with_details()
     serializer_class = AdminBookingSerializer
     permission_classes = [IsAdminUser]
 
 
+# (ADMIN) Stream Bookings As CSV (?format=csv) Or JSON Lines (?format=jsonl)
+class AdminBookingExportView(generics.GenericAPIView):
+    queryset = Booking.objects.order_by("id")
+    permission_classes = [IsAdminUser]
+    filter_backends = [BookingDateWindowFilter]
+    renderer_classes = [CSVRenderer, JSONLinesRenderer]
+
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        rows = transfer.export_rows(self.filter_queryset(self.get_queryset()))
+        stream = (
+            transfer.astream
+            if isinstance(request._request, ASGIRequest)
+            else transfer.stream
+        )
+        response = StreamingHttpResponse(
+            stream(rows, renderer.format),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="bookings.{renderer.format}"'
+        )
+        return response
+
+    def handle_exception(self, exc):
+        # Errors are reported as JSON whatever export format was asked for
+        self.request.accepted_renderer = FastJSONRenderer()
+        self.request.accepted_media_type = FastJSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+# (ADMIN) Import Bookings From An Uploaded .csv Or .jsonl File
+class AdminBookingImportView(APIView):
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        fmt = transfer.detect_format(upload.name) if upload else None
+        if fmt is None:
+            return Response(
+                {"file": "Upload a .csv or .jsonl file."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        report = transfer.import_bookings(upload, fmt)
+        return Response(
+            report,
+            status=(
+                status.HTTP_201_CREATED
+                if report["created"]
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+
 # (ADMIN) Create And List ALL Availabilitys
 class AdminAvailabilityListCreateView(generics.ListCreateAPIView):
     queryset = Availability.objects.all()
@@ -81,11 +188,17 @@ class AdminAvailabilityListCreateView(generics.ListCreateAPIView):
 
 
 # (ADMIN) Create Availability with Overlap Check
-class AdminAvailabilityListCreateView(generics.ListCreateAPIView):
+class AdminAvailabilityListCreateView(CompactListMixin, generics.ListCreateAPIView):
     queryset = Availability.objects.all()
     serializer_class = AdminAvailabilitySerializer
     permission_classes = [IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        availability = self.filter_queryset(self.get_queryset())
+        return self.compact_list(
+            compact.availability_records(availability), compact.availability_rows
+        )
+
     def create(self, request, *args, **kwargs):
         # Overlap check
         date = request.data.get("date")
@@ -104,6 +217,122 @@ class AdminAvailabilityListCreateView(generics.ListCreateAPIView):
         return super().create(request, *args, **kwargs)
 
 
+# (ADMIN) Availability, Bookings And Services For ?from=YYYY-MM-DD&to=YYYY-MM-DD
+class AdminCalendarView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        date_from = parse_window_date(request.query_params, "from")
+        date_to = parse_window_date(request.query_params, "to")
+        if date_from and date_to and date_to < date_from:
+            raise serializers.ValidationError({"to": "Must not be before from."})
+
+        # SET TRANSACTION has to come first in its transaction, so it is left
+        # out when the request already runs in one (ATOMIC_REQUESTS, tests)
+        snapshot = connection.vendor == "postgresql" and not connection.in_atomic_block
+        with transaction.atomic():
+            if snapshot:
+                # All three lists are read from the same snapshot
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"
+                    )
+            services = list(Service.objects.all())
+            availability = self.get_availability(date_from, date_to)
+            bookings = self.get_bookings(date_from, date_to, services)
+
+        return Response(
+            {
+                "from": date_from,
+                "to": date_to,
+                "services": AdminServiceSerializer(services, many=True).data,
+                "availability": availability,
+                "bookings": bookings,
+            }
+        )
+
+    def get_availability(self, date_from, date_to):
+        availability = Availability.objects.order_by("date", "start_time")
+        if date_from:
+            availability = availability.filter(date__gte=date_from)
+        if date_to:
+            availability = availability.filter(date__lte=date_to)
+        return list(
+            availability.values("id", "date", "start_time", "end_time", "is_available")
+        )
+
+    def get_bookings(self, date_from, date_to, services):
+        bookings = Booking.objects.order_by("date_time", "id")
+        if date_from:
+            bookings = bookings.filter(end_time__gt=day_bounds(date_from, date_from)[0])
+        if date_to:
+            bookings = bookings.filter(date_time__lt=day_bounds(date_to, date_to)[1])
+
+        # Services are referenced by id and resolved against the list above
+        service_ids = {}
+        for booking_id, service_id in Booking.services.through.objects.filter(
+            booking__in=bookings
+        ).values_list("booking_id", "service_id"):
+            service_ids.setdefault(booking_id, []).append(service_id)
+        worktimes = {service.id: service.worktime for service in services}
+
+        rows = []
+        for row in bookings.values(
+            "id",
+            "user_id",
+            "user__name",
+            "user__surname",
+            "date_time",
+            "end_time",
+            "notes",
+        ):
+            ids = service_ids.get(row["id"], [])
+            end_time = row["end_time"] or row["date_time"] + sum(
+                (worktimes[service_id] for service_id in ids), timedelta()
+            )
+            rows.append(
+                {
+                    "id": row["id"],
+                    "user": row["user_id"],
+                    "user_name": f"{row['user__name']} {row['user__surname']}",
+                    "mine": row["user_id"] == self.request.user.id,
+                    "date_time": row["date_time"],
+                    "end_time": end_time,
+                    "service_ids": ids,
+                    "notes": row["notes"],
+                }
+            )
+        return rows
+
+
+# (ADMIN) Create & List Recurring Weekly Schedules
+class AdminRecurringScheduleListCreateView(generics.ListCreateAPIView):
+    queryset = RecurringSchedule.objects.all()
+    serializer_class = RecurringScheduleSerializer
+    permission_classes = [IsAdminUser]
+
+
+# (ADMIN) Update, Delete Recurring Schedule
+class AdminRecurringScheduleUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = RecurringSchedule.objects.all()
+    serializer_class = RecurringScheduleSerializer
+    permission_classes = [IsAdminUser]
+
+
+# (ADMIN) Expand A Recurring Schedule Into Availability
+class AdminRecurringScheduleGenerateView(generics.GenericAPIView):
+    queryset = RecurringSchedule.objects.all()
+    serializer_class = RecurringScheduleSerializer
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        created, skipped = generate_availability(self.get_object())
+        return Response(
+            {"created": created, "skipped": skipped},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
 # (ADMIN) Update, Delete Availability
 class AdminAvailabilityUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Availability.objects.all()
@@ -112,10 +341,11 @@ class AdminAvailabilityUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # List Available Services (USER)
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(CatalogueCacheMixin, generics.ListAPIView):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    catalogue_name = "services"
 
 
 # Create A New Booking (USER)
@@ -124,44 +354,54 @@ class BookingCreateView(generics.CreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def perform_create(self, serializer):
-        services = serializer.validated_data["services"]
-
-        # Initiate total_worktime as timedelta
-        total_worktime = timedelta()
-
-        for service in services:
-            total_worktime += service.worktime
-
-        # Check availability based on total_worktime
-        booking_time = serializer.validated_data["date_time"]
-        end_time = booking_time + total_worktime
-
-        # Convert booking_time and end_time to naive local time
-        local_booking_time = localtime(booking_time).replace(tzinfo=None)
-        local_end_time = localtime(end_time).replace(tzinfo=None)
-
-        available_slots = Availability.objects.filter(
-            date=local_booking_time.date(),
-            start_time__lte=local_booking_time.time(),
-            end_time__gte=local_end_time.time(),
-            is_available=True,
-        )
-
-        is_slot_available = False
-        for slot in available_slots:
-            slot_start = datetime.combine(slot.date, slot.start_time)
-            slot_end = datetime.combine(slot.date, slot.end_time)
-            if local_booking_time >= slot_start and local_end_time <= slot_end:
-                is_slot_available = True
-                break
-
-        if not is_slot_available:
-            raise serializers.ValidationError(
-                {"error": "No available slot for the selected services"}
-            )
+    def create(self, request, *args, **kwargs):
+        # Replay the stored outcome when a client retries with the same key
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return self.create_booking(request, *args, **kwargs)
+
+        request_hash = idempotency.fingerprint(request.data)
+        record, created = idempotency.claim(request.user, key, request_hash)
+        if not created:
+            if record.request_hash != request_hash:
+                return Response(
+                    {"detail": "This Idempotency-Key was used with another body."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is None:
+                return Response(
+                    {"detail": "A request with this Idempotency-Key is in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(record.response, status=record.status_code)
+
+        try:
+            response = self.create_booking(request, *args, **kwargs)
+        except serializers.ValidationError as exc:
+            response = self.handle_exception(exc)
+        except Exception:
+            # Unexpected failures release the key so the client can retry
+            record.delete()
+            raise
+
+        idempotency.store(record, response)
+        return response
+
+    def create_booking(self, request, *args, **kwargs):
+        # Validation and save share one transaction, so the availability row
+        # locked by the serializer stays locked until the booking is written
+        with transaction.atomic():
+            lock_bookings()
+            return super().create(request, *args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["lock_slot"] = True
+        return context
 
-        # Save booking if its within available times
+    def perform_create(self, serializer):
+        # The serializer already resolved the availability window and checked
+        # for overlaps under the row lock
         serializer.save(user=self.request.user)
 
 
@@ -187,29 +427,28 @@ class BookingUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # List User Bookings (USER)
-class BookingListView(generics.ListAPIView):
+class BookingListView(
+    CompactListMixin, WatermarkConditionalMixin, generics.ListAPIView
+):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [BookingDateWindowFilter]
+    pagination_class = BookingCursorPagination
 
-    def get(self, request, *args, **kwargs):
-        bookings = Booking.objects.filter(user=self.request.user).prefetch_related(
-            "services"
+    def get_queryset(self):
+        return Booking.objects.filter(user=self.request.user).order_by(
+            "date_time", "id"
         )
 
-        user_data = [
-            {
-                "date_time": booking.date_time.isoformat(),
-                "end_time": booking.calculate_end_time().isoformat(),
-                "services": [
-                    {"name": service.name, "worktime": service.worktime}
-                    for service in booking.services.all()
-                ],
-                "id": booking.id,
-                "created_at": booking.created_at,
-            }
-            for booking in bookings
-        ]
-        return Response(user_data)
+    def get(self, request, *args, **kwargs):
+        bookings = self.filter_queryset(self.get_queryset())
+        return self.conditional_list(
+            bookings,
+            lambda: self.compact_list(
+                compact.user_booking_records(bookings),
+                partial(compact.user_booking_rows, private=True),
+            ),
+        )
 
 
 # Retrieve Booking details (USER)
@@ -220,31 +459,182 @@ class BookingDetailView(generics.RetrieveAPIView):
 
 
 # Create & List Availability Slots (USER)
-class AvailabilityListCreateView(generics.ListCreateAPIView):
+class AvailabilityListCreateView(
+    CompactListMixin, WatermarkConditionalMixin, generics.ListCreateAPIView
+):
     queryset = Availability.objects.all()
     serializer_class = AvailabilitySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        availability = self.filter_queryset(self.get_queryset())
+        return self.conditional_list(
+            availability,
+            lambda: self.compact_list(
+                compact.availability_records(availability), compact.availability_rows
+            ),
+        )
+
+
+# List Free Start Times For The Selected Services (USER)
+class FreeSlotsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # Accept both ?service_ids=1,2 and ?service_ids=1&service_ids=2
+        service_ids = [
+            service_id
+            for value in request.query_params.getlist("service_ids")
+            for service_id in value.split(",")
+            if service_id
+        ]
+        serializer = FreeSlotsQuerySerializer(
+            data={
+                "date_from": request.query_params.get("date_from"),
+                "date_to": request.query_params.get("date_to"),
+                "service_ids": service_ids,
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        duration = sum(
+            [service.worktime for service in params["services"]], timedelta()
+        )
+        slots = find_free_slots(params["date_from"], params["date_to"], duration)
+
+        return Response(
+            {
+                "duration": duration_string(duration),
+                "slots": [slot.isoformat() for slot in slots],
+            }
+        )
+
 
 # List ALL Bookings w/o User Details, Excluding current user's own bookings (USER)
-class AllBookingsListView(generics.ListAPIView):
+class AllBookingsListView(
+    CompactListMixin, WatermarkConditionalMixin, generics.ListAPIView
+):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [BookingDateWindowFilter]
+    pagination_class = BookingCursorPagination
 
-    def get(self, request, *args, **kwargs):
+    def get_queryset(self):
         # Exclude current user's bookings
-        bookings = Booking.objects.exclude(user=request.user).prefetch_related(
-            "services"
+        return Booking.objects.exclude(user=self.request.user).order_by(
+            "date_time", "id"
+        )
+
+    def get(self, request, *args, **kwargs):
+        bookings = self.filter_queryset(self.get_queryset())
+        return self.conditional_list(
+            bookings,
+            lambda: self.compact_list(
+                compact.user_booking_records(bookings),
+                partial(compact.user_booking_rows, private=False),
+            ),
         )
-        anonymized_data = [
+
+
+# Hand Out A Short-Lived Ticket That Opens The Calendar Stream (USER)
+class CalendarStreamTicketView(APIView):
+    # The ticket replaces the access token in the stream URL, see bookings.streams
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return Response(
             {
-                "date_time": booking.date_time.isoformat(),
-                "end_time": booking.calculate_end_time().isoformat(),
-                "services": [
-                    {"name": service.name, "worktime": service.worktime}
-                    for service in booking.services.all()
-                ],
+                "ticket": streams.make_ticket(request.user),
+                "expires_in": streams.TICKET_SECONDS,
             }
-            for booking in bookings
+        )
+
+
+# Delta Sync Of Bookings And Availability Since A Token (USER)
+class CalendarChangesView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        if not since:
+            # First call: hand out a token, the client then loads the full
+            # lists once and polls with the token from here on
+            return Response(
+                {
+                    "token": changes.make_token(changes.settled_change_id()),
+                    "has_more": False,
+                    "bookings": {"upserted": [], "deleted": []},
+                    "availability": {"upserted": [], "deleted": []},
+                }
+            )
+
+        try:
+            since_id = changes.read_token(since)
+        except signing.SignatureExpired:
+            return Response(
+                {"detail": "Sync token expired, reload the calendar."},
+                status=status.HTTP_410_GONE,
+            )
+        except (signing.BadSignature, ValueError):
+            return Response(
+                {"detail": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        actions, cursor, has_more = changes.collect(since_id)
+
+        upserted = {CalendarChange.BOOKING: [], CalendarChange.AVAILABILITY: []}
+        deleted = {CalendarChange.BOOKING: [], CalendarChange.AVAILABILITY: []}
+        for (model, object_id), action in actions.items():
+            if action == CalendarChange.DELETED:
+                deleted[model].append(object_id)
+            else:
+                upserted[model].append(object_id)
+
+        bookings = Booking.objects.filter(
+            id__in=upserted[CalendarChange.BOOKING]
+        ).prefetch_related("services")
+        availability = Availability.objects.filter(
+            id__in=upserted[CalendarChange.AVAILABILITY]
+        )
+
+        with perf.serialize_timer():
+            booking_data = [
+                {
+                    "id": booking.id,
+                    **anonymized_booking_data(booking, booking.services.all()),
+                    "mine": booking.user_id == request.user.id,
+                }
+                for booking in bookings
+            ]
+        availability_data = AvailabilitySerializer(availability, many=True).data
+
+        # Rows deleted after the last change read here are sent as tombstones
+        # too, so the client never keeps a phantom entry
+        found_bookings = {booking["id"] for booking in booking_data}
+        found_availability = {avail["id"] for avail in availability_data}
+        deleted[CalendarChange.BOOKING] += [
+            booking_id
+            for booking_id in upserted[CalendarChange.BOOKING]
+            if booking_id not in found_bookings
         ]
-        return Response(anonymized_data)
+        deleted[CalendarChange.AVAILABILITY] += [
+            avail_id
+            for avail_id in upserted[CalendarChange.AVAILABILITY]
+            if avail_id not in found_availability
+        ]
+
+        return Response(
+            {
+                "token": changes.make_token(cursor),
+                "has_more": has_more,
+                "bookings": {
+                    "upserted": booking_data,
+                    "deleted": deleted[CalendarChange.BOOKING],
+                },
+                "availability": {
+                    "upserted": availability_data,
+                    "deleted": deleted[CalendarChange.AVAILABILITY],
+                },
+            }
+        )
@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from "react";
 import { axiosReq } from "../api/axiosDefaults";
 import { DateTime } from "luxon";
+import { fetchAllPages } from "../utils/pagination";
 
 const useBookingEvents = (isAdmin = false) => {
     const [events, setEvents] = useState([]);
@@ -11,16 +12,23 @@ const useBookingEvents = (isAdmin = false) => {
     const fetchEvents = useCallback(async () => {
         setLoading(true);
         try {
-            // Deside endpoint based on user status
-            const availabilityUrl = isAdmin ? "/admin/availability/" : "/availability/";
-            const allBookingsUrl = isAdmin ? "/admin/bookings/" : "/bookings/all/";
-            const myBookingsUrl = "/bookings/mine/";
-            const servicesUrl = isAdmin ? "/admin/services/" : "/services/";
-
-            const { data: availability } = await axiosReq.get(availabilityUrl);
-            const { data: allBookings } = await axiosReq.get(allBookingsUrl);
-            const { data: myBookings } = await axiosReq.get(myBookingsUrl);
-            const { data: servicesData } = await axiosReq.get(servicesUrl);
+            let availability, allBookings, myBookings, servicesData;
+            if (isAdmin) {
+                // Admins get everything from one snapshot in a single request
+                const { data: calendar } = await axiosReq.get("/admin/calendar/");
+                availability = calendar.availability;
+                allBookings = calendar.bookings.filter((booking) => !booking.mine);
+                myBookings = calendar.bookings.filter((booking) => booking.mine);
+                servicesData = calendar.services;
+            } else {
+                ({ data: availability } = await axiosReq.get("/availability/"));
+                // Other customers' past bookings never block a new one
+                allBookings = await fetchAllPages("/bookings/all/", {
+                    date_from: DateTime.now().toISODate(),
+                });
+                myBookings = await fetchAllPages("/bookings/mine/");
+                ({ data: servicesData } = await axiosReq.get("/services/"));
+            }
 
             setServices(servicesData);
 
@@ -10,6 +10,7 @@ import {
     Alert,
 } from "react-bootstrap";
 import { axiosReq } from "../api/axiosDefaults";
+import { fetchAllPages } from "../utils/pagination";
 import { useNavigate } from "react-router-dom";
 
 const AdminPage = () => {
@@ -50,8 +51,7 @@ const AdminPage = () => {
                 setServices(servicesRes.data);
 
                 // Fetch Bookings
-                const bookingsRes = await axiosReq.get("/admin/bookings/");
-                setBookings(bookingsRes.data);
+                setBookings(await fetchAllPages("/admin/bookings/"));
 
                 // Fetch Users
                 const usersRes = await axiosReq.get("/accounts/users/");
@@ -0,0 +1,16 @@
+import { axiosReq } from "../api/axiosDefaults";
+
+// Follow the cursor "next" links of a paginated booking list and return
+// every row. The next links already carry the query string.
+export const fetchAllPages = async (url, params = {}) => {
+  const results = [];
+  let next = url;
+  let query = { page_size: 500, ...params };
+  while (next) {
+    const { data } = await axiosReq.get(next, { params: query });
+    results.push(...data.results);
+    next = data.next;
+    query = undefined;
+  }
+  return results;
+};